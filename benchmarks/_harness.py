@@ -0,0 +1,79 @@
+"""
+Shared setup for the benchmarks: import the app offline, on fixture data.
+
+stock_analyzer.py is a Streamlit script, so importing it renders the page in
+Streamlit's bare mode (expect "missing ScriptRunContext" warnings). Settings
+are read at import, so load_app() must run before anything else imports it.
+"""
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import make_fixtures
+
+ROOT = make_fixtures.ROOT
+
+def load_app(bars=500):
+    """
+    Import stock_analyzer with the fixture provider and an empty price cache.
+    - Uses MARKET_DATA_FIXTURE_DIR if it is set, otherwise generates the
+      deterministic fixture set into a temporary directory
+    """
+    workdir = tempfile.mkdtemp(prefix='stock_analyzer_bench_')
+    fixture_dir = os.environ.get('MARKET_DATA_FIXTURE_DIR') or os.path.join(workdir, 'fixtures')
+    if not os.path.isdir(fixture_dir):
+        make_fixtures.write_fixtures(fixture_dir, make_fixtures.load_symbols(), pd.Timestamp.today(), bars)
+
+    os.environ['MARKET_DATA_PROVIDER'] = 'fixture'
+    os.environ['MARKET_DATA_FIXTURE_DIR'] = fixture_dir
+    os.environ['PRICE_CACHE_PATH'] = os.path.join(workdir, 'prices.sqlite')
+    sys.path.insert(0, ROOT)
+    import stock_analyzer
+    return stock_analyzer
+
+def clear_price_cache(app):
+    """Delete the SQLite price cache so the next fetch is cold"""
+    for suffix in ('', '-wal', '-shm'):
+        path = app.PRICE_CACHE_PATH + suffix
+        if os.path.exists(path):
+            os.remove(path)
+
+def add_latency(provider, seconds):
+    """
+    Make every provider call sleep first, to stand in for network round trips.
+    - batch_history sleeps one round trip per max_workers tickers: yf.download
+      sends one request per ticker on that many threads
+    """
+    for name in ('history', 'metadata', 'has_history', 'lookup_symbol'):
+        call = getattr(provider, name)
+
+        def slow(*args, _call=call, **kwargs):
+            time.sleep(seconds)
+            return _call(*args, **kwargs)
+
+        setattr(provider, name, slow)
+
+    batch_history = provider.batch_history
+
+    def slow_batch(tickers, start_date, end_date, max_workers=1):
+        time.sleep(seconds * math.ceil(len(tickers) / max(1, max_workers)))
+        return batch_history(tickers, start_date, end_date, max_workers)
+
+    provider.batch_history = slow_batch
+
+def best_time(func, *args, repeat=5, **kwargs):
+    """Fastest wall time of repeat calls, and the last result"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+def cleanup(app):
+    shutil.rmtree(os.path.dirname(app.PRICE_CACHE_PATH), ignore_errors=True)
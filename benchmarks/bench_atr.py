@@ -0,0 +1,54 @@
+"""
+ATR(14): NumPy atr_kernel vs the concatenated-DataFrame version it replaced.
+
+Times both on fixture-shaped OHLC frames of several lengths, reports peak
+allocation with tracemalloc and the largest relative difference. Bars are
+one minute apart: 100,000 business days would reach back before 1677, the
+start of pandas' datetime64[ns] range.
+
+    python benchmarks/bench_atr.py --rows 280 5000 100000
+"""
+import argparse
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import _harness
+import make_fixtures
+
+def atr_dataframe(df, period=14):
+    """The pre-kernel ATR: three Series concatenated, row max, rolling mean"""
+    high_low = df['High'] - df['Low']
+    high_close = np.abs(df['High'] - df['Close'].shift())
+    low_close = np.abs(df['Low'] - df['Close'].shift())
+    true_range = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+    return true_range.rolling(period).mean()
+
+def peak_bytes(func, *args):
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, nargs='*', default=[280, 5_000, 100_000])
+    args = parser.parse_args()
+
+    app = _harness.load_app()
+    for rows in args.rows:
+        df = make_fixtures.generate_bars('BENCH', pd.Timestamp.today(), rows, freq='min')
+        before, expected = _harness.best_time(atr_dataframe, df, repeat=20)
+        after, actual = _harness.best_time(app.calculate_atr, df, repeat=20)
+        with np.errstate(invalid='ignore'):
+            drift = np.nanmax(np.abs(actual.to_numpy() / expected.to_numpy() - 1))
+        print(f"{rows:>7} rows: DataFrame {before * 1e6:8.0f} us / {peak_bytes(atr_dataframe, df) / 1024:7.0f} KiB, "
+              f"kernel {after * 1e6:8.0f} us / {peak_bytes(app.calculate_atr, df) / 1024:7.0f} KiB, "
+              f"max relative difference {drift:.1e}")
+
+    _harness.cleanup(app)
+
+if __name__ == '__main__':
+    main()
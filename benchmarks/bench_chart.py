@@ -0,0 +1,48 @@
+"""
+Chart payload: SVG figure vs WebGL figure from create_chart.
+
+For each history length and point budget, times building the figure and
+serializing it with fig.to_json() (what st.plotly_chart sends to the
+browser) and reports the JSON size. The WebGL figure only shrinks on Plotly
+6+, whose encoder ships numeric arrays as base64 typed arrays ("bdata");
+older releases write them out as JSON number lists. Browser render time is
+not covered: it needs a browser.
+
+    python benchmarks/bench_chart.py --bars 286 1565 --max-points 0 600
+"""
+import argparse
+
+import pandas as pd
+import plotly
+
+import _harness
+import make_fixtures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--bars', type=int, nargs='*', default=[286, 1565],
+                        help='history lengths (286 bars is the 400-day window)')
+    parser.add_argument('--max-points', type=int, nargs='*', default=[0, 600],
+                        help='point budgets; 0 draws every bar')
+    args = parser.parse_args()
+
+    app = _harness.load_app()
+    print(f"plotly {plotly.__version__}")
+    for bars in args.bars:
+        df = app.add_indicators(make_fixtures.generate_bars('BENCH', pd.Timestamp.today(), bars))
+        for max_points in args.max_points:
+            sizes = []
+            for webgl in (False, True):
+                build, fig = _harness.best_time(app.create_chart, df, 'BENCH',
+                                                max_points=max_points or None, webgl=webgl)
+                serialize, payload = _harness.best_time(fig.to_json)
+                sizes.append(len(payload))
+                print(f"{bars:>5} bars, budget {max_points or 'none':>4}, {'WebGL' if webgl else 'SVG  '}: "
+                      f"{len(payload) / 1024:6.0f} KiB, build {build * 1000:5.1f} ms, "
+                      f"to_json {serialize * 1000:5.1f} ms")
+            print(f"{'':>23}WebGL payload {sizes[1] / sizes[0]:.0%} of SVG")
+
+    _harness.cleanup(app)
+
+if __name__ == '__main__':
+    main()
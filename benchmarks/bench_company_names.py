@@ -0,0 +1,66 @@
+"""
+Company-name matching in extract_tickers_from_text: trie regex vs substring loop.
+
+Builds a long synthetic document of filler words with only a few company
+names, all near the end (the realistic case: a holdings list at the back of
+a report), and times one pass of the trie-compiled pattern against the
+per-name substring loop it replaced, for the COMPANY_TO_TICKER table and for
+every name and alias in the symbol index. --hits 0 times a document with no
+names at all, where every substring search has to scan the whole text.
+
+    python benchmarks/bench_company_names.py --chars 650000 --hits 3
+"""
+import argparse
+import random
+
+import _harness
+
+FILLER = ['REVENUE', 'GROWTH', 'QUARTER', 'HOLDINGS', 'MARKET', 'SHARES', 'PORTFOLIO',
+          'ALLOCATION', 'RISK', 'RETURN', 'INCOME', 'SECTOR', 'WEIGHT', 'INDEX', 'FUND']
+
+def make_document(names, chars, hits, seed=0):
+    """Filler text of about chars characters with hits names in its last 1%"""
+    rng = random.Random(seed)
+    words = []
+    size = 0
+    while size < chars:
+        word = rng.choice(FILLER)
+        words.append(word)
+        size += len(word) + 1
+    tail = len(words) - max(1, len(words) // 100)
+    for name in rng.sample(names, hits):
+        words.insert(rng.randrange(tail, len(words)), name)
+    return ' '.join(words)
+
+def substring_loop(names, text):
+    """The pre-trie matcher: one substring search per name"""
+    return [name for name in names if name in text]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--chars', type=int, default=650_000, help='document size (~200 pages)')
+    parser.add_argument('--hits', type=int, nargs='*', default=[0, 3],
+                        help='company names in the document (one run per value)')
+    args = parser.parse_args()
+
+    app = _harness.load_app()
+    index = app.load_symbol_index()
+    tables = {
+        'COMPANY_TO_TICKER': list(app.COMPANY_TO_TICKER),
+        'symbol index': sorted(index['names']),
+    }
+
+    for label, names in tables.items():
+        pattern = app.build_company_name_pattern(names)
+        for hits in args.hits:
+            text = make_document(names, args.chars, hits)
+            loop_time, loop_found = _harness.best_time(substring_loop, names, text)
+            trie_time, trie_found = _harness.best_time(lambda: [m.group() for m in pattern.finditer(text)])
+            assert set(trie_found) <= set(loop_found)
+            print(f"{label} ({len(names)} names), {hits} in {len(text):,} chars: "
+                  f"substring loop {loop_time * 1000:.1f} ms, trie regex {trie_time * 1000:.1f} ms")
+
+    _harness.cleanup(app)
+
+if __name__ == '__main__':
+    main()
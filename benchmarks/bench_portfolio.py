@@ -0,0 +1,56 @@
+"""
+analyze_portfolio throughput by worker count, offline on fixture data.
+
+Every run starts from a cold price cache and adds simulated latency to each
+provider call. max_workers sets the download threads of a batch (one request
+per ticker, as yf.download sends them) and the per-ticker fallback pool. With
+--no-batch the provider's batch download returns nothing, so every ticker
+goes through that fallback.
+
+Writing each ticker to the SQLite cache costs a few tens of milliseconds on
+the calling thread whatever the worker count; the default latency is a
+realistic Yahoo round trip, well above that floor, so the network time that
+workers overlap dominates. --latency 0 measures the floor on its own.
+
+    python benchmarks/bench_portfolio.py --tickers 120 --latency 0.3 --no-batch
+"""
+import argparse
+import time
+
+import _harness
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--tickers', type=int, default=120, help='portfolio size')
+    parser.add_argument('--latency', type=float, default=0.3,
+                        help='seconds added to every provider call')
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--no-batch', action='store_true',
+                        help='force the per-ticker fallback for every ticker')
+    args = parser.parse_args()
+
+    app = _harness.load_app()
+    provider = app.get_market_data_provider()
+    _harness.add_latency(provider, args.latency)
+    if args.no_batch:
+        provider.batch_history = lambda *a, **k: {}
+
+    portfolio = app.get_universe_tickers('S&P 500')[:args.tickers]
+    print(f"{len(portfolio)} tickers, {args.latency}s per provider call, "
+          f"{'per-ticker' if args.no_batch else 'batched'} fetch")
+
+    for workers in args.workers:
+        _harness.clear_price_cache(app)
+        updates = []
+        started = time.perf_counter()
+        results = app.analyze_portfolio(portfolio, max_workers=workers,
+                                        on_progress=lambda *update: updates.append(update))
+        elapsed = time.perf_counter() - started
+        found = sum(1 for row in results if row)
+        print(f"{workers:>3} workers: {elapsed:6.2f}s  {len(portfolio) / elapsed:7.1f} tickers/s  "
+              f"{found}/{len(portfolio)} with data, {len(updates)} progress updates")
+
+    _harness.cleanup(app)
+
+if __name__ == '__main__':
+    main()
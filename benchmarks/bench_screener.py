@@ -0,0 +1,48 @@
+"""
+Screener latency against SCREENER_LATENCY_BUDGET, offline on fixture data.
+
+Runs run_screener over a built-in universe with a cold price cache and then
+a warm one, optionally adding simulated latency to every provider call.
+Exits non-zero if any run goes over the budget.
+
+    python benchmarks/bench_screener.py --universe "S&P 500" --latency 0.5
+"""
+import argparse
+import sys
+import time
+
+import _harness
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--universe', default='S&P 500')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added to every provider call')
+    parser.add_argument('--warm-runs', type=int, default=1)
+    args = parser.parse_args()
+
+    app = _harness.load_app()
+    if args.latency:
+        _harness.add_latency(app.get_market_data_provider(), args.latency)
+
+    tickers = app.get_universe_tickers(args.universe)
+    print(f"{args.universe}: {len(tickers)} tickers, budget {app.SCREENER_LATENCY_BUDGET}s, "
+          f"provider latency {args.latency}s")
+
+    over_budget = False
+    tables = []
+    for run in ['cold'] + ['warm'] * args.warm_runs:
+        started = time.perf_counter()
+        results, failed = app.run_screener(tickers)
+        elapsed = time.perf_counter() - started
+        tables.append(results)
+        over_budget |= elapsed > app.SCREENER_LATENCY_BUDGET
+        print(f"{run:>5}: {elapsed:6.2f}s  {len(results)} rows, {len(failed)} without data")
+
+    identical = all(table.equals(tables[0]) for table in tables[1:])
+    print(f"identical tables across runs: {identical}")
+    _harness.cleanup(app)
+    return 1 if over_budget or not identical else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
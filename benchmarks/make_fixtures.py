@@ -0,0 +1,100 @@
+"""
+Generate a deterministic market data fixture set for the 'fixture' provider.
+
+Writes <TICKER>.csv (or .parquet) with daily OHLCV bars and a metadata.json
+for every symbol in symbol_index.json, so the app and the benchmarks run
+offline. Prices come from a random walk seeded by the ticker, so every run
+produces the same bars; only their dates follow --end (default: today), which
+keeps the app's trailing 400-day window covered.
+
+    python benchmarks/make_fixtures.py
+    MARKET_DATA_PROVIDER=fixture PRICE_CACHE_PATH=/tmp/fixture_cache.sqlite \
+        streamlit run stock_analyzer.py
+"""
+import argparse
+import json
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_symbols(path=os.path.join(ROOT, 'symbol_index.json')):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['symbols']
+
+def generate_bars(ticker, end, bars, seed=0, freq='B'):
+    """
+    OHLCV for one ticker: a geometric random walk seeded by the ticker.
+    - Bars are business days by default; benchmarks that need more bars than
+      the datetime64 range holds as business days pass freq='min'
+    """
+    rng = np.random.default_rng(zlib.crc32(ticker.encode()) ^ seed)
+    dates = pd.bdate_range(end=pd.Timestamp(end).normalize(), periods=bars, freq=freq, name='Date')
+
+    start_price = rng.uniform(10, 500)
+    volatility = rng.uniform(0.01, 0.03)
+    drift = rng.normal(0.0003, 0.0005)
+    close = start_price * np.exp(np.cumsum(rng.normal(drift, volatility, bars)))
+
+    open_ = np.empty(bars)
+    open_[0] = start_price
+    open_[1:] = close[:-1] * (1 + rng.normal(0, volatility / 4, bars - 1))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 2, bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 2, bars)))
+    volume = np.round(rng.lognormal(15, 0.5, bars))
+
+    return pd.DataFrame(
+        {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume},
+        index=dates
+    ).round({'Open': 4, 'High': 4, 'Low': 4, 'Close': 4})
+
+def write_fixtures(out, symbols, end, bars, fmt='csv', seed=0):
+    """Write one file per symbol plus metadata.json; returns the number of tickers"""
+    os.makedirs(out, exist_ok=True)
+    metadata = {}
+    for entry in symbols:
+        ticker = entry['ticker']
+        df = generate_bars(ticker, end, bars, seed)
+        if fmt == 'parquet':
+            df.to_parquet(os.path.join(out, f'{ticker}.parquet'))
+        else:
+            df.to_csv(os.path.join(out, f'{ticker}.csv'))
+
+        last_year = df.iloc[-252:]
+        metadata[ticker] = {
+            'symbol': ticker,
+            'longName': entry['name'],
+            'exchange': entry.get('exchange'),
+            'fiftyTwoWeekHigh': float(last_year['High'].max()),
+            'fiftyTwoWeekLow': float(last_year['Low'].min()),
+            'averageVolume': float(last_year['Volume'].mean()),
+        }
+
+    with open(os.path.join(out, 'metadata.json'), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=1)
+    return len(metadata)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--out', default=os.path.join(ROOT, 'fixtures'), help='output directory')
+    parser.add_argument('--end', default=pd.Timestamp.today().strftime('%Y-%m-%d'),
+                        help='date of the last bar (default: today)')
+    parser.add_argument('--bars', type=int, default=500, help='trading days per ticker')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tickers', nargs='*', help='limit to these symbols')
+    args = parser.parse_args()
+
+    symbols = load_symbols()
+    if args.tickers:
+        wanted = {t.upper() for t in args.tickers}
+        symbols = [entry for entry in symbols if entry['ticker'] in wanted]
+
+    count = write_fixtures(args.out, symbols, args.end, args.bars, args.format, args.seed)
+    print(f"Wrote {count} tickers x {args.bars} bars to {args.out}")
+
+if __name__ == '__main__':
+    main()
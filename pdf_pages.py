@@ -0,0 +1,28 @@
+"""
+Process-pool workers for PDF text extraction.
+
+stock_analyzer.py is a Streamlit script, so it can't be imported by pool
+workers without re-running the app; spawned workers import this module
+instead. The pool hides the app's __main__ while workers start (spawn would
+otherwise re-run it in each one), so this module must not import the app.
+"""
+import io
+
+import pdfplumber
+
+# Bytes of the PDF this worker parses, set once by init_worker
+_document = None
+
+def init_worker(data):
+    """Pool initializer: keep the document so tasks only carry page numbers"""
+    global _document
+    _document = data
+
+def extract_page_range(first_page, last_page):
+    """Text of pages first_page..last_page (1-based) of the worker's document"""
+    texts = []
+    with pdfplumber.open(io.BytesIO(_document), pages=range(first_page, last_page + 1)) as pdf:
+        for page in pdf.pages:
+            texts.append(page.extract_text() or "")
+            page.close()
+    return texts
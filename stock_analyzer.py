@@ -1,14 +1,58 @@
 import streamlit as st
 import yfinance as yf
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from openpyxl.utils import get_column_letter
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from collections import OrderedDict, deque
+from contextlib import closing, contextmanager
+import csv
 import io
+import json
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import random
 import re
+import sqlite3
+import sys
+import threading
+import time
+import types
+
+try:
+    from yfinance.exceptions import YFRateLimitError
+except ImportError:
+    YFRateLimitError = None
+
+try:
+    import curl_cffi
+    from curl_cffi import Curl, CurlInfo
+    from curl_cffi import requests as curl_requests
+    CURL_SUPPORT = True
+except ImportError:
+    CURL_SUPPORT = False
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    ARROW_SUPPORT = True
+except ImportError:
+    ARROW_SUPPORT = False
 
 try:
     import pdfplumber
+    import pdf_pages
     PDF_SUPPORT = True
 except ImportError:
     PDF_SUPPORT = False
@@ -48,6 +92,102 @@ COMPANY_TO_TICKER = {
     'VANGUARD': 'VTI', 'INVESCO': 'QQQ', 'ISHARES': 'IVV'
 }
 
+# Number of tickers fetched in parallel by the portfolio analysis
+PORTFOLIO_MAX_WORKERS = 8
+
+# Number of tickers requested per batch download
+PORTFOLIO_BATCH_SIZE = 50
+
+# Spreadsheet headers that mark a column as holding ticker symbols
+TICKER_COLUMN_HEADERS = {'TICKER', 'TICKERS', 'SYMBOL', 'SYMBOLS', 'TICKER SYMBOL', 'STOCK SYMBOL'}
+
+# .xlsx workbooks at least this large are streamed row by row instead of
+# being loaded into DataFrames
+EXCEL_STREAMING_MIN_BYTES = 5 * 1024 * 1024
+EXCEL_STREAMING_CHUNK_ROWS = 5000
+
+# PDFs with at least this many pages are parsed on a process pool (see pdf_pages)
+PDF_PROCESS_POOL_MIN_PAGES = 50
+PDF_PROCESS_POOL_WORKERS = min(os.cpu_count() or 1, 8)
+
+# Local OHLCV store so repeat runs only download bars newer than the cache
+PRICE_CACHE_PATH = os.environ.get(
+    'PRICE_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.price_cache.sqlite')
+)
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Regular US trading session, used to decide how long fetched data stays fresh
+MARKET_TIMEZONE = ZoneInfo('America/New_York')
+MARKET_OPEN = (9, 30)
+MARKET_CLOSE = (16, 0)
+
+# While the market is open, memoized prices are refetched this often
+INTRADAY_REFRESH_MINUTES = 5
+
+# Upper bound on entries kept by each in-process memo
+MEMO_MAX_ENTRIES = 256
+
+# Bundled, versioned list of known symbols (ticker, name, aliases, exchange)
+SYMBOL_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'symbol_index.json')
+
+# Index tickers are common shares: 1-5 letters plus an optional class suffix (BRK-B)
+SYMBOL_INDEX_TICKER_PATTERN = re.compile(r'[A-Z]{1,5}(-[A-Z])?')
+
+# How long network symbol lookups (including misses) are remembered
+SYMBOL_LOOKUP_TTL = timedelta(days=1)
+
+# How long company metadata (yfinance .info) is reused before refetching
+COMPANY_INFO_TTL = timedelta(hours=6)
+
+# Screener runs over a whole universe should finish within this many seconds
+SCREENER_LATENCY_BUDGET = 60
+
+# Default screen: constituents trading more than this far below their 150-MA
+SCREENER_DEFAULT_GAP_PCT = -5.0
+
+# Yahoo request pacing: sustained requests per second and burst size. A
+# yf.download batch costs one request per ticker, so the default burst lets
+# one batch through at once and a cold 500-ticker screen paces in ~22 s. The
+# scheduler halves the rate on every 429, so these are ceilings
+YF_REQUESTS_PER_SECOND = float(os.environ.get('YF_REQUESTS_PER_SECOND', 20))
+YF_REQUEST_BURST = int(os.environ.get('YF_REQUEST_BURST', PORTFOLIO_BATCH_SIZE))
+
+# Attempts after the first for a throttled or transient failure; the backoff
+# window starts at YF_BACKOFF_BASE seconds and doubles per attempt
+YF_MAX_RETRIES = 4
+YF_BACKOFF_BASE = 1.0
+YF_BACKOFF_MAX = 30.0
+
+# Retry budget shared by all requests: each request earns YF_RETRY_BUDGET_RATIO
+# of a retry, up to YF_RETRY_BUDGET banked, so an outage can't multiply load
+YF_RETRY_BUDGET = 20
+YF_RETRY_BUDGET_RATIO = 0.2
+
+# Keep-alive curl handles shared by every Yahoo request; also caps how many
+# requests are in flight at once
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+
+# Market data backend: 'yfinance' (network) or 'fixture' (local CSV/Parquet files
+# under MARKET_DATA_FIXTURE_DIR, for offline, deterministic benchmarks). Point
+# PRICE_CACHE_PATH elsewhere when using fixtures so they don't mix with real prices.
+# benchmarks/make_fixtures.py writes a deterministic set to the default directory
+MARKET_DATA_PROVIDER = os.environ.get('MARKET_DATA_PROVIDER', 'yfinance')
+MARKET_DATA_FIXTURE_DIR = os.environ.get(
+    'MARKET_DATA_FIXTURE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+)
+
+# Chart point budget: plot width in pixels times points per pixel. Longer
+# histories are downsampled server-side to this many candles/line points
+CHART_WIDTH_PX = 1200
+CHART_POINTS_PER_PIXEL = 0.5
+
+# Built chart figures kept for reuse across reruns
+CHART_CACHE_MAX_ENTRIES = 32
+
+COMPANY_NAME_SUFFIXES = {'INC', 'CORP', 'CORPORATION', 'CO', 'COMPANY', 'PLC', 'LTD', 'HOLDINGS'}
+
 # Clean, Modern Light Theme CSS
 st.markdown("""
 <style>
@@ -373,20 +513,550 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def classify_request_error(error):
+    """
+    Sort a failed request into how it should be retried.
+    - 'rate_limit': throttled (HTTP 429); back off and slow every caller down
+    - 'transient': network hiccup or timeout; back off and retry
+    - 'permanent': bad symbol, parse error, etc.; retrying won't help
+    """
+    if YFRateLimitError is not None and isinstance(error, YFRateLimitError):
+        return 'rate_limit'
+    message = str(error)
+    if '429' in message or 'Too Many Requests' in message or 'Rate limited' in message:
+        return 'rate_limit'
+    if isinstance(error, (ConnectionError, TimeoutError, OSError)):
+        return 'transient'
+    return 'permanent'
+
+class RequestScheduler:
+    """
+    Paces calls to a rate-limited API and retries the ones that fail.
+    - Token bucket: rate tokens/second, up to burst banked
+    - The rate halves on every throttled response and creeps back up by 5%
+      of the configured rate per success, so large runs settle at the
+      highest rate the server tolerates
+    - Retries back off exponentially with jitter, and throttling pauses
+      every caller for the backoff, not just the one that hit it
+    - Retries draw from a shared budget (see YF_RETRY_BUDGET)
+    """
+
+    def __init__(self, rate=YF_REQUESTS_PER_SECOND, burst=YF_REQUEST_BURST,
+                 max_retries=YF_MAX_RETRIES, backoff_base=YF_BACKOFF_BASE,
+                 backoff_max=YF_BACKOFF_MAX, retry_budget=YF_RETRY_BUDGET,
+                 retry_budget_ratio=YF_RETRY_BUDGET_RATIO,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_budget = retry_budget
+        self.retry_budget_ratio = retry_budget_ratio
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._retry_tokens = retry_budget
+        self.stats = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'failures': 0}
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, cost=1):
+        """
+        Block until cost tokens are available, then take them.
+        - Costs above the burst size are let through once the bucket is full
+          and paid back as debt, delaying the callers behind them
+        """
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                needed = min(cost, self.burst)
+                # Refill rounding can leave the bucket a hair short of a whole
+                # token; waiting that out would never advance the clock
+                if now >= self._paused_until and self._tokens >= needed - 1e-9:
+                    self._tokens -= cost
+                    return
+                wait = max(self._paused_until - now, (needed - self._tokens) / self.rate)
+            self._sleep(wait)
+
+    def _backoff(self, attempt):
+        """Equal jitter: half the exponential window fixed, half random"""
+        window = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return window / 2 + random.uniform(0, window / 2)
+
+    def call(self, func, *args, cost=1, **kwargs):
+        """Run func(*args, **kwargs) under the rate limit, retrying recoverable errors"""
+        with self._lock:
+            self.stats['requests'] += 1
+            self._retry_tokens = min(self.retry_budget, self._retry_tokens + self.retry_budget_ratio)
+
+        attempt = 0
+        while True:
+            self.acquire(cost)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                kind = classify_request_error(e)
+                with self._lock:
+                    if kind == 'rate_limit':
+                        self.stats['rate_limited'] += 1
+                        self.rate = max(self.max_rate / 16, self.rate / 2)
+                    can_retry = (
+                        kind != 'permanent'
+                        and attempt < self.max_retries
+                        and self._retry_tokens >= 1
+                    )
+                    if not can_retry:
+                        self.stats['failures'] += 1
+                        raise
+                    self._retry_tokens -= 1
+                    self.stats['retries'] += 1
+                    delay = self._backoff(attempt)
+                    if kind == 'rate_limit':
+                        self._paused_until = max(self._paused_until, self._clock() + delay)
+                attempt += 1
+                self._sleep(delay)
+                continue
+
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+            return result
+
+if CURL_SUPPORT:
+    class PooledSession(curl_requests.Session):
+        """
+        curl_cffi session that reuses a fixed pool of curl handles across threads.
+        - A plain Session keeps one handle (and connection cache) per thread, so
+          every short-lived worker thread opens fresh TLS connections
+        - Here each request borrows a handle from the pool and returns it, so
+          keep-alive connections survive across threads and batches
+        - stats counts requests and the new connections they had to open
+        - Lending works by swapping curl_cffi's private per-thread handle
+          (Session._local). If a release drops it, the session logs a warning
+          and behaves like a plain Session instead
+        """
+
+        def __init__(self, pool_size=HTTP_POOL_SIZE, **kwargs):
+            kwargs.setdefault('impersonate', 'chrome')
+            super().__init__(curl_infos=[CurlInfo.NUM_CONNECTS], **kwargs)
+            self.pool_size = pool_size
+            self.pooled = hasattr(self, '_local')
+            if not self.pooled:
+                logger.warning(
+                    "curl_cffi %s Session has no _local; HTTP connections won't be pooled",
+                    getattr(curl_cffi, '__version__', '?')
+                )
+            self._handles = queue.LifoQueue()
+            for _ in range(pool_size if self.pooled else 0):
+                self._handles.put(Curl())
+            self._stats_lock = threading.Lock()
+            self.stats = {'requests': 0, 'connections': 0}
+
+        def request(self, method, url, *args, **kwargs):
+            if not self.pooled:
+                response = super().request(method, url, *args, **kwargs)
+            else:
+                response = self._pooled_request(method, url, *args, **kwargs)
+            with self._stats_lock:
+                self.stats['requests'] += 1
+                self.stats['connections'] += response.infos.get(CurlInfo.NUM_CONNECTS, 0)
+            return response
+
+        def _pooled_request(self, method, url, *args, **kwargs):
+            handle = self._handles.get()
+            self._local.curl = handle
+            try:
+                return super().request(method, url, *args, **kwargs)
+            finally:
+                self._local.curl = None
+                self._handles.put(handle)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight call.
+    - The first caller for a key runs the function; callers arriving while it
+      runs wait and get the same result (or exception) instead of repeating it
+    - Nothing is cached: once the call finishes the next caller runs it again
+    - stats counts calls that ran and calls that shared another's result
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {'executed': 0, 'shared': 0}
+
+    def _claim(self, keys):
+        """Split keys into new calls this caller leads and calls already in flight"""
+        led, joined = {}, {}
+        with self._lock:
+            for key in keys:
+                if key in self._calls:
+                    joined[key] = self._calls[key]
+                else:
+                    led[key] = self._calls[key] = self._Call()
+            self.stats['executed'] += len(led)
+            self.stats['shared'] += len(joined)
+        return led, joined
+
+    def _finish(self, led):
+        with self._lock:
+            for key in led:
+                del self._calls[key]
+        for call in led.values():
+            call.done.set()
+
+    @staticmethod
+    def _wait(call):
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key, func, *args, **kwargs):
+        """Return func(*args, **kwargs), sharing it with concurrent callers for key"""
+        led, joined = self._claim([key])
+        if joined:
+            return self._wait(joined[key])
+        call = led[key]
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            self._finish(led)
+
+    def do_many(self, keys, func):
+        """
+        Batch form of do().
+        - func(keys) is called once with only the keys nobody else is fetching
+          and returns {key: result}
+        - Returns {key: result} for every key, waiting on the shared ones
+        """
+        led, joined = self._claim(dict.fromkeys(keys))
+        try:
+            if led:
+                results = func(list(led))
+                for key, call in led.items():
+                    call.result = results.get(key)
+        except Exception as e:
+            for call in led.values():
+                call.error = e
+            raise
+        finally:
+            self._finish(led)
+        return {key: self._wait(led.get(key) or joined[key]) for key in keys}
+
+class _ErrorLogCollector(logging.Handler):
+    """Keeps the messages of ERROR records logged on one thread while attached"""
+
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.thread = threading.get_ident()
+        self.messages = []
+
+    def emit(self, record):
+        if record.thread == self.thread:
+            self.messages.append(record.getMessage())
+
+class YFinanceProvider:
+    """
+    Market data from Yahoo Finance via yfinance.
+    - Every request goes through one RequestScheduler, so concurrent
+      callers share the rate limit and retry budget
+    """
+
+    name = 'yfinance'
+
+    def __init__(self, scheduler=None, session=None):
+        self.scheduler = scheduler or RequestScheduler()
+        # yf.download keeps per-run state in module globals on older yfinance
+        # releases; the provider is shared by every session, so this lock is too
+        self._download_lock = threading.Lock()
+        if session is None and CURL_SUPPORT:
+            session = PooledSession()
+        # None lets yfinance manage its own session (no curl_cffi installed)
+        self.session = session
+
+    def _ticker(self, symbol):
+        return yf.Ticker(symbol, session=self.session)
+
+    def connection_stats(self):
+        """HTTP requests made and new connections opened so far, or None if not tracked"""
+        stats = getattr(self.session, 'stats', None)
+        return dict(stats) if stats is not None else None
+
+    def history(self, ticker, start_date, end_date):
+        """Daily OHLCV for one ticker in [start_date, end_date), or None if there is none"""
+        df = self.scheduler.call(
+            self._ticker(ticker).history, start=start_date, end=end_date, auto_adjust=True
+        )
+        return None if df.empty else df
+
+    def _download(self, *args, **kwargs):
+        """
+        yf.download under the download lock.
+        - yf.download leaves failed symbols out of its result and only logs
+          why (older releases also keep it in yf.shared._ERRORS). If any of
+          them was throttled, the whole call raises a rate-limit error so the
+          scheduler backs off and retries the batch
+        """
+        collector = _ErrorLogCollector()
+        yf_logger = logging.getLogger('yfinance')
+        with self._download_lock:
+            yf_logger.addHandler(collector)
+            try:
+                raw = yf.download(*args, **kwargs)
+            finally:
+                yf_logger.removeHandler(collector)
+            errors = collector.messages
+            errors += [str(e) for e in getattr(getattr(yf, 'shared', None), '_ERRORS', {}).values()]
+
+        throttled = [message for message in errors if classify_request_error(RuntimeError(message)) == 'rate_limit']
+        if throttled:
+            raise RuntimeError(f"Rate limited during batch download: {throttled[0]}")
+        return raw
+
+    def batch_history(self, tickers, start_date, end_date, max_workers=PORTFOLIO_MAX_WORKERS):
+        """
+        Daily OHLCV for many tickers in one request.
+        - Returns {ticker: df}; tickers missing from the response are left out
+        - Rate-limit tokens and backoff are waited out before taking the
+          download lock, so one paced batch doesn't block every session
+        """
+        raw = self.scheduler.call(
+            self._download,
+            tickers,
+            start=start_date,
+            end=end_date,
+            group_by='ticker',
+            # Older yf.download defaults to unadjusted prices; the cache
+            # must hold the same adjusted closes as Ticker.history
+            auto_adjust=True,
+            threads=max(1, min(max_workers, len(tickers))),
+            progress=False,
+            session=self.session,
+            cost=len(tickers)
+        )
+        frames = {}
+        for ticker in tickers:
+            df = self._split_batch_frame(raw, ticker)
+            if df is not None:
+                frames[ticker] = df
+        return frames
+
+    @staticmethod
+    def _split_batch_frame(raw, ticker):
+        """Pull one ticker's OHLCV out of a yf.download(group_by='ticker') frame"""
+        if raw is None or raw.empty or not isinstance(raw.columns, pd.MultiIndex):
+            return None
+        if ticker not in raw.columns.get_level_values(0):
+            return None
+        df = raw[ticker].dropna(how='all')
+        return None if df.empty else df.copy()
+
+    def metadata(self, ticker):
+        """Company metadata (the yfinance .info dict)"""
+        return self.scheduler.call(lambda: self._ticker(ticker).info)
+
+    def has_history(self, symbol):
+        """Whether the symbol has traded recently"""
+        return not self.scheduler.call(self._ticker(symbol).history, period="1d").empty
+
+    def lookup_symbol(self, text):
+        """Best-effort symbol for free text, or None"""
+        info = self.scheduler.call(lambda: self._ticker(text).info)
+        if info and 'symbol' in info:
+            return info['symbol']
+        return None
+
+class FixtureProvider:
+    """
+    Market data read from local files, for offline benchmarks and load tests.
+    - <directory>/<TICKER>.csv or <TICKER>.parquet: a Date column plus OHLCV columns
+    - <directory>/metadata.json (optional): {ticker: metadata dict}
+    - Files are read once and kept in memory
+    - benchmarks/make_fixtures.py generates a deterministic set
+    """
+
+    name = 'fixture'
+
+    def __init__(self, directory=MARKET_DATA_FIXTURE_DIR):
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(
+                f"No market data fixtures in {directory}; generate them with "
+                "python benchmarks/make_fixtures.py"
+            )
+        self.directory = directory
+        self._frames = {}
+        self._lock = threading.Lock()
+        try:
+            with open(os.path.join(directory, 'metadata.json'), encoding='utf-8') as f:
+                self._metadata = {t.upper(): info for t, info in json.load(f).items()}
+        except (OSError, ValueError):
+            self._metadata = {}
+
+    def _load(self, ticker):
+        with self._lock:
+            if ticker in self._frames:
+                return self._frames[ticker]
+
+        df = None
+        base = os.path.join(self.directory, ticker)
+        if os.path.exists(base + '.parquet'):
+            df = pd.read_parquet(base + '.parquet')
+        elif os.path.exists(base + '.csv'):
+            df = pd.read_csv(base + '.csv')
+        if df is not None:
+            if 'Date' in df.columns:
+                df = df.set_index('Date')
+            df.index = pd.DatetimeIndex(pd.to_datetime(df.index), name='Date')
+            df = df.sort_index()
+
+        with self._lock:
+            self._frames[ticker] = df
+        return df
+
+    def _window(self, ticker, start_date, end_date):
+        df = self._load(ticker.upper())
+        if df is None:
+            return None
+        df = df[(df.index >= pd.Timestamp(start_date).normalize()) & (df.index < pd.Timestamp(end_date))]
+        return None if df.empty else df.copy()
+
+    def history(self, ticker, start_date, end_date):
+        return self._window(ticker, start_date, end_date)
+
+    def batch_history(self, tickers, start_date, end_date, max_workers=PORTFOLIO_MAX_WORKERS):
+        # Reads the files directly rather than through history(), so a batch
+        # stays one call when benchmarks wrap the public methods with latency
+        frames = {}
+        for ticker in tickers:
+            df = self._window(ticker, start_date, end_date)
+            if df is not None:
+                frames[ticker] = df
+        return frames
+
+    def metadata(self, ticker):
+        ticker = ticker.upper()
+        if ticker in self._metadata:
+            return self._metadata[ticker]
+        return {'symbol': ticker} if self._load(ticker) is not None else {}
+
+    def has_history(self, symbol):
+        return self._load(symbol.upper()) is not None
+
+    def lookup_symbol(self, text):
+        key = _normalize_company_name(text)
+        for ticker, info in self._metadata.items():
+            if key in (ticker, _normalize_company_name(info.get('longName', ''))):
+                return ticker
+        return text.upper() if self.has_history(text) else None
+
+MARKET_DATA_PROVIDERS = {'yfinance': YFinanceProvider, 'fixture': FixtureProvider}
+
+@st.cache_resource(show_spinner=False)
+def get_market_data_provider(name=MARKET_DATA_PROVIDER):
+    """The configured market data backend, shared by every session of the server"""
+    if name not in MARKET_DATA_PROVIDERS:
+        raise ValueError(f"Unknown market data provider: {name}")
+    return MARKET_DATA_PROVIDERS[name]()
+
+def _normalize_company_name(name):
+    """Uppercase a company name and drop punctuation and corporate suffixes"""
+    words = re.sub(r'[^A-Z0-9& ]', ' ', name.upper()).split()
+    if words and words[0] == 'THE':
+        words = words[1:]
+    while len(words) > 1 and words[-1] in COMPANY_NAME_SUFFIXES:
+        words = words[:-1]
+    return ' '.join(words)
+
+def validate_symbol_index(entries):
+    """
+    Raise ValueError if the index has malformed tickers (anything but a common
+    share, e.g. a preferred like GS-PK) or lists a company name twice
+    """
+    problems = [
+        f"bad ticker {entry['ticker']!r}" for entry in entries
+        if not SYMBOL_INDEX_TICKER_PATTERN.fullmatch(entry['ticker'])
+    ]
+    seen = {}
+    for entry in entries:
+        name = _normalize_company_name(entry['name'])
+        if name in seen:
+            problems.append(f"{entry['name']!r} listed for both {seen[name]} and {entry['ticker']}")
+        seen.setdefault(name, entry['ticker'])
+    if problems:
+        raise ValueError("Invalid symbol index: " + "; ".join(problems))
+
+@st.cache_resource(show_spinner=False)
+def load_symbol_index(path=SYMBOL_INDEX_PATH):
+    """
+    Load the bundled symbol index once per server process.
+    - symbols: {ticker: entry}
+    - names: {normalized company name or alias: ticker}
+    - A malformed index raises ValueError (see validate_symbol_index)
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+
+    validate_symbol_index(data.get('symbols', []))
+    symbols = {entry['ticker']: entry for entry in data.get('symbols', [])}
+    names = {}
+    for ticker, entry in symbols.items():
+        for name in [entry['name'], *entry.get('aliases', [])]:
+            names.setdefault(_normalize_company_name(name), ticker)
+
+    return {'version': data.get('version'), 'symbols': symbols, 'names': names}
+
+@st.cache_data(ttl=SYMBOL_LOOKUP_TTL, show_spinner=False)
+def _symbol_has_history(symbol):
+    """Network check for symbols missing from the index; misses are cached too"""
+    return get_market_data_provider().has_history(symbol)
+
+@st.cache_data(ttl=SYMBOL_LOOKUP_TTL, show_spinner=False)
+def _lookup_symbol_online(text):
+    return get_market_data_provider().lookup_symbol(text)
+
 def resolve_ticker(input_text):
     """Convert company name to ticker symbol if needed"""
     input_upper = input_text.upper().strip()
+    index = load_symbol_index()
+
+    # Known symbols resolve without touching the network
+    if input_upper in index['symbols']:
+        return input_upper
 
-    # Check if it's already a valid ticker (try to fetch)
+    # Something shaped like a ticker is only rewritten through a company name
+    # if it isn't a valid symbol itself ("HP" is Helmerich & Payne, not HP Inc.)
     if len(input_upper) <= 5 and input_upper.isalpha():
         try:
-            stock = yf.Ticker(input_upper)
-            hist = stock.history(period="1d")
-            if not hist.empty:
+            if _symbol_has_history(input_upper):
                 return input_upper
         except:
             pass
 
+    name_key = _normalize_company_name(input_upper)
+    if name_key in index['names']:
+        return index['names'][name_key]
+
     # Check our mapping
     if input_upper in COMPANY_TO_TICKER:
         return COMPANY_TO_TICKER[input_upper]
@@ -396,35 +1066,67 @@ def resolve_ticker(input_text):
         if company in input_upper or input_upper in company:
             return ticker
 
-    # Try yfinance search as fallback
+    # Try the market data provider's lookup as fallback
     try:
-        search = yf.Ticker(input_upper)
-        if search.info and 'symbol' in search.info:
-            return search.info['symbol']
+        symbol = _lookup_symbol_online(input_upper)
+        if symbol:
+            return symbol
     except:
         pass
 
     return input_upper
 
+def rolling_mean(values, window):
+    """
+    Trailing mean over `window` rows along axis 0 of a 1-D or 2-D float array.
+    - Uses a cumulative sum, so the cost does not depend on the window
+    - Any NaN inside a window gives NaN, like pandas' default min_periods
+    """
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] -= sums[:-window]
+    counts[window:] -= counts[:-window]
+    means = sums / window
+    means[counts < window] = np.nan
+    return means
+
+def atr_kernel(high, low, close, period=14):
+    """
+    Average True Range on raw float arrays (1-D, or 2-D with one column per ticker).
+    - True range is a NaN-skipping np.fmax chain, matching DataFrame.max(axis=1)
+    """
+    prev_close = np.empty_like(close)
+    prev_close[:1] = np.nan
+    prev_close[1:] = close[:-1]
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    return rolling_mean(true_range, period)
+
 def calculate_atr(df, period=14):
-    high = df['High']
-    low = df['Low']
-    close = df['Close']
-    tr1 = high - low
-    tr2 = abs(high - close.shift(1))
-    tr3 = abs(low - close.shift(1))
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    atr = tr.rolling(window=period).mean()
-    return atr
+    atr = atr_kernel(
+        df['High'].to_numpy(dtype=float),
+        df['Low'].to_numpy(dtype=float),
+        df['Close'].to_numpy(dtype=float),
+        period
+    )
+    return pd.Series(atr, index=df.index)
 
 def calculate_stop_loss(ma150, atr):
     """
     Calculate stop loss based on:
     - Position around -1.5% of 150-day MA
     - Adjusted for ATR to avoid unwanted executions
+    Scalars return None when either input is missing; arrays and Series
+    return the whole stop-loss series with NaN where either input is NaN
     """
-    if pd.isna(ma150) or pd.isna(atr):
-        return None
+    if np.ndim(ma150) == 0 and np.ndim(atr) == 0:
+        if pd.isna(ma150) or pd.isna(atr):
+            return None
+    else:
+        if not isinstance(ma150, pd.Series):
+            ma150 = np.asarray(ma150, dtype=float)
+        if not isinstance(atr, pd.Series):
+            atr = np.asarray(atr, dtype=float)
 
     # Base stop loss: 1.5% below the 150-day MA
     base_stop = ma150 * 0.985
@@ -436,48 +1138,700 @@ def calculate_stop_loss(ma150, atr):
 
     return stop_loss
 
+def add_indicators(df):
+    """
+    Copy of an OHLCV frame with the 150-day MA and 14-day ATR columns added.
+    - The input is left untouched, since price frames can be shared between sessions
+    """
+    return df.assign(
+        MA150=df['Close'].rolling(window=150).mean(),
+        ATR=calculate_atr(df, period=14)
+    )
+
+class RollingMean:
+    """
+    Trailing mean over the last `window` values, updated in constant time.
+    - Kahan-compensated running sum; agrees with Series.rolling(window).mean()
+      to float rounding
+    - Any NaN inside the window gives NaN, like pandas' default min_periods
+    - undo() takes back the latest value (and restores the one it pushed out),
+      so a revised last bar can be replaced
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.compensation = 0.0
+        self.nans = 0
+        self._evicted = None
+
+    def _add(self, value):
+        if math.isnan(value):
+            self.nans += 1
+            return
+        y = value - self.compensation
+        t = self.total + y
+        self.compensation = (t - self.total) - y
+        self.total = t
+
+    def _remove(self, value):
+        if math.isnan(value):
+            self.nans -= 1
+            return
+        self._add(-value)
+
+    def push(self, value):
+        """Append one value and return the mean of the current window"""
+        value = float(value)
+        self.values.append(value)
+        self._add(value)
+        self._evicted = self.values.popleft() if len(self.values) > self.window else None
+        if self._evicted is not None:
+            self._remove(self._evicted)
+        return self.mean()
+
+    def undo(self):
+        """Drop the latest value; only one push can be taken back"""
+        self._remove(self.values.pop())
+        if self._evicted is not None:
+            self.values.appendleft(self._evicted)
+            self._add(self._evicted)
+            self._evicted = None
+
+    def mean(self):
+        if len(self.values) < self.window or self.nans:
+            return math.nan
+        return self.total / self.window
+
+class IncrementalIndicators:
+    """
+    MA150 and ATR(14) maintained bar by bar in constant time.
+    - update() appends one bar and returns its (ma150, atr); revise() replaces
+      the latest bar, e.g. a partial session that has moved since
+    - True range skips NaN like atr_kernel's np.fmax chain
+    """
+
+    def __init__(self, ma_window=150, atr_period=14):
+        self.ma = RollingMean(ma_window)
+        self.atr = RollingMean(atr_period)
+        self.prev_close = math.nan
+        self.last_close = math.nan
+
+    @classmethod
+    def from_frame(cls, df, ma_window=150, atr_period=14):
+        """
+        State after the bars of an OHLC frame.
+        - Only the last ma_window + 1 bars can still affect either indicator,
+          so only those are replayed
+        """
+        engine = cls(ma_window, atr_period)
+        tail = df.iloc[-(max(ma_window, atr_period) + 1):]
+        for high, low, close in zip(tail['High'], tail['Low'], tail['Close']):
+            engine.update(high, low, close)
+        return engine
+
+    def update(self, high, low, close):
+        """Append one bar and return its (ma150, atr)"""
+        true_range = high - low
+        for gap in (abs(high - self.last_close), abs(low - self.last_close)):
+            if math.isnan(true_range) or gap > true_range:
+                true_range = gap
+        self.prev_close, self.last_close = self.last_close, float(close)
+        return self.ma.push(close), self.atr.push(true_range)
+
+    def revise(self, high, low, close):
+        """Replace the latest bar and return its new (ma150, atr)"""
+        self.ma.undo()
+        self.atr.undo()
+        self.last_close = self.prev_close
+        return self.update(high, low, close)
+
+class IndicatorCache:
+    """
+    Indicator frames kept per key together with the IncrementalIndicators
+    state behind them, so a price-cache top-up only computes the new rows.
+    - When the prices continue the cached frame (its second-to-last bar is
+      unchanged), the last cached bar is revised and newer bars are appended
+      through the state, O(1) per bar
+    - Anything else (first request, re-adjusted history) is rebuilt with
+      add_indicators
+    - Rows at the front of an extended frame keep values computed from bars
+      that have since slid out of the window
+    - Keeps the max_entries most recently used keys
+    """
+
+    def __init__(self, max_entries=MEMO_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.stats = {'rebuilt': 0, 'extended': 0, 'bars_computed': 0}
+
+    @staticmethod
+    def _overlap(frame, prices):
+        """
+        (first, pos) when prices continue frame: frame.iloc[first:-1] are the
+        bars of prices.iloc[:pos], and prices.iloc[pos] revises frame's last bar
+        """
+        if len(frame) < 2:
+            return None
+        pos = prices.index.searchsorted(frame.index[-1])
+        if pos == 0 or pos >= len(prices) or prices.index[pos] != frame.index[-1]:
+            return None
+        if prices.index[pos - 1] != frame.index[-2] or prices['Close'].iat[pos - 1] != frame['Close'].iat[-2]:
+            return None
+        first = len(frame) - 1 - pos
+        if first < 0 or frame.index[first] != prices.index[0]:
+            return None
+        return first, pos
+
+    def frame(self, key, prices):
+        """prices with MA150 and ATR columns, extending the frame cached under key"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            overlap = self._overlap(entry[1], prices) if entry else None
+            if overlap is None:
+                state = IncrementalIndicators.from_frame(prices)
+                frame = add_indicators(prices)
+                self.stats['rebuilt'] += 1
+            else:
+                state, cached = entry
+                first, pos = overlap
+                rows = zip(*(prices[column].to_numpy()[pos:] for column in ('High', 'Low', 'Close')))
+                values = [state.revise(*next(rows))] + [state.update(*bar) for bar in rows]
+                ma, atr = np.array(values).T
+                frame = prices.assign(
+                    MA150=np.concatenate([cached['MA150'].to_numpy()[first:-1], ma]),
+                    ATR=np.concatenate([cached['ATR'].to_numpy()[first:-1], atr])
+                )
+                self.stats['extended'] += 1
+                self.stats['bars_computed'] += len(values)
+            self._entries[key] = (state, frame)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return frame
+
+def _price_cache_connect():
+    conn = sqlite3.connect(PRICE_CACHE_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS prices (
+            ticker TEXT, date TEXT,
+            open REAL, high REAL, low REAL, close REAL, volume REAL,
+            PRIMARY KEY (ticker, date)
+        )
+    """)
+    # first_date is the earliest date a full download has covered; fetched_at
+    # is when the ticker last reached the network, in market time
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS coverage (
+            ticker TEXT PRIMARY KEY, first_date TEXT, fetched_at TEXT
+        )
+    """)
+    return conn
+
+def _price_cache_plan(tickers, start_date):
+    """
+    Decide what each ticker still needs from the network.
+    - Returns {ticker: (fetch_from, last_cached_bar)}
+    - last_cached_bar is (date, close) for a top-up, or None for a full download
+    - fetch_from is None when the ticker was already fetched within the
+      current market_data_version(), so no new bars can exist yet
+    """
+    start_day = start_date.strftime('%Y-%m-%d')
+    version = market_data_version()
+    plan = {}
+    with closing(_price_cache_connect()) as conn:
+        for ticker in tickers:
+            row = conn.execute(
+                "SELECT c.first_date, p.date, p.close, c.fetched_at FROM coverage c "
+                "JOIN prices p ON p.ticker = c.ticker "
+                "WHERE c.ticker = ? ORDER BY p.date DESC LIMIT 1",
+                (ticker,)
+            ).fetchone()
+            if row is None or row[0] > start_day:
+                plan[ticker] = (start_date, None)
+            elif row[3] and _fetched_version(row[3]) == version:
+                plan[ticker] = (None, (row[1], row[2]))
+            else:
+                # Re-fetch the last cached bar too, it may have been a partial session
+                plan[ticker] = (datetime.strptime(row[1], '%Y-%m-%d'), (row[1], row[2]))
+    return plan
+
+def _fetched_version(fetched_at):
+    """market_data_version() at a stored fetched_at (naive values are local time)"""
+    return market_data_version(datetime.fromisoformat(fetched_at).astimezone(MARKET_TIMEZONE))
+
+def _expire_cached_prices(ticker=None):
+    """Make the next request for a ticker (or every ticker) top up from the network"""
+    with closing(_price_cache_connect()) as conn, conn:
+        if ticker is None:
+            conn.execute("UPDATE coverage SET fetched_at = NULL")
+        else:
+            conn.execute("UPDATE coverage SET fetched_at = NULL WHERE ticker = ?", (ticker,))
+
+def _store_prices(ticker, df, start_date, last_cached_bar=None):
+    """
+    Merge freshly downloaded bars into the cache.
+    - Returns False if a top-up disagrees with the cached history (the
+      provider re-adjusted past prices for a split/dividend) so the caller
+      can fall back to a full download
+    """
+    if df is None or df.empty:
+        return True
+
+    df = df[PRICE_COLUMNS]
+    dates = pd.DatetimeIndex(df.index).strftime('%Y-%m-%d')
+
+    if last_cached_bar is not None:
+        cached_date, cached_close = last_cached_bar
+        overlap = df['Close'][dates == cached_date]
+        if len(overlap) and abs(overlap.iloc[0] - cached_close) > 1e-6 * max(abs(cached_close), 1):
+            return False
+
+    rows = [
+        (ticker, day, float(o), float(h), float(l), float(c), float(v) if pd.notna(v) else None)
+        for day, (o, h, l, c, v) in zip(dates, df.itertuples(index=False, name=None))
+    ]
+    with closing(_price_cache_connect()) as conn, conn:
+        if last_cached_bar is None:
+            conn.execute("DELETE FROM prices WHERE ticker = ?", (ticker,))
+            conn.execute(
+                "INSERT OR REPLACE INTO coverage (ticker, first_date, fetched_at) VALUES (?, ?, ?)",
+                (ticker, start_date.strftime('%Y-%m-%d'), datetime.now(MARKET_TIMEZONE).isoformat())
+            )
+        else:
+            conn.execute(
+                "UPDATE coverage SET fetched_at = ? WHERE ticker = ?",
+                (datetime.now(MARKET_TIMEZONE).isoformat(), ticker)
+            )
+        conn.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    return True
+
+def _read_cached_prices(ticker, start_date, end_date):
+    with closing(_price_cache_connect()) as conn:
+        rows = conn.execute(
+            "SELECT date, open, high, low, close, volume FROM prices "
+            "WHERE ticker = ? AND date >= ? AND date <= ? ORDER BY date",
+            (ticker, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+        ).fetchall()
+    if not rows:
+        return None
+    df = pd.DataFrame(rows, columns=['Date'] + PRICE_COLUMNS)
+    df.index = pd.DatetimeIndex(pd.to_datetime(df.pop('Date')), name='Date')
+    return df
+
+@st.cache_resource(show_spinner=False)
+def get_price_fetches():
+    """Process-wide single-flight for price history, keyed on (ticker, days)"""
+    return SingleFlight()
+
+@st.cache_resource(show_spinner=False)
+def get_indicator_cache():
+    """Process-wide MA150/ATR frames, keyed on (ticker, days)"""
+    return IndicatorCache()
+
+def get_price_history(ticker, start_date, end_date):
+    """OHLCV for a ticker, served from the local cache and topped up from the network"""
+    fetch_from, last_cached_bar = _price_cache_plan([ticker], start_date)[ticker]
+    if fetch_from is None:
+        return _read_cached_prices(ticker, start_date, end_date)
+    fresh = _fetch_history(ticker, fetch_from, end_date)
+    if not _store_prices(ticker, fresh, start_date, last_cached_bar):
+        _store_prices(ticker, _fetch_history(ticker, start_date, end_date), start_date)
+    return _read_cached_prices(ticker, start_date, end_date)
+
 def get_stock_data(ticker, days=400):
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
-    stock = yf.Ticker(ticker)
-    df = stock.history(start=start_date, end=end_date)
-    if df.empty:
-        return None, None
-    df['MA150'] = df['Close'].rolling(window=150).mean()
-    df['ATR'] = calculate_atr(df, period=14)
-    return df, stock.info
-
-def get_stock_summary(input_ticker):
-    """Get summary data for a single ticker or company name"""
-    try:
-        # Resolve company name to ticker if needed
-        ticker = resolve_ticker(input_ticker)
+    # Sessions asking for the same ticker at the same time share one fetch
+    df = get_price_fetches().do((ticker, days), get_price_history, ticker, start_date, end_date)
+    if df is None or df.empty:
+        return None
+    # Top-ups only compute indicators for the bars they added
+    return get_indicator_cache().frame((ticker, days), df)
 
-        df, info = get_stock_data(ticker)
-        if df is None or df.empty:
-            return None
+@st.cache_data(ttl=COMPANY_INFO_TTL, show_spinner=False)
+def _fetch_company_info(ticker):
+    return get_market_data_provider().metadata(ticker)
+
+def get_company_info(ticker):
+    """Company metadata, fetched only when a view needs it and cached for COMPANY_INFO_TTL"""
+    try:
+        return _fetch_company_info(ticker) or {}
+    except Exception:
+        return {}
+
+def get_company_name(ticker):
+    """Display name from the symbol index, falling back to company metadata"""
+    entry = load_symbol_index()['symbols'].get(ticker)
+    if entry:
+        return entry['name']
+    return get_company_info(ticker).get('longName', ticker)
+
+def _fetch_history(ticker, start_date, end_date):
+    """Single-ticker history fetch, used for symbols missing from a batch"""
+    try:
+        return get_market_data_provider().history(ticker, start_date, end_date)
+    except Exception:
+        return None
 
-        current_price = df['Close'].iloc[-1]
-        ma150 = df['MA150'].iloc[-1]
-        atr = df['ATR'].iloc[-1]
-        stop_loss = calculate_stop_loss(ma150, atr)
+def _download_batch(tickers, start_date, end_date, max_workers):
+    try:
+        return get_market_data_provider().batch_history(tickers, start_date, end_date, max_workers)
+    except Exception:
+        return {}
 
-        if pd.notna(ma150) and ma150 != 0:
-            gap_pct = ((current_price - ma150) / ma150) * 100
+def get_batch_price_history(tickers, days=400, max_workers=PORTFOLIO_MAX_WORKERS, on_frame=None):
+    """
+    Fetch OHLCV for many tickers with as few batch requests as possible.
+    - Returns {ticker: OHLCV df, or None if no data}
+    - Cached tickers only download bars since their last cached date
+    - Tickers missing from the batch response are fetched one by one
+    - Tickers another session is already fetching for the same window are
+      waited on instead of downloaded again
+    - on_frame(ticker) is called on the calling thread as each ticker's frame
+      is ready, once per ticker
+    """
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+
+    reported = set()
+
+    def report(ticker):
+        reported.add(ticker)
+        if on_frame:
+            on_frame(ticker)
+
+    def fetch(keys):
+        frames = _fetch_batch_price_history([t for t, _ in keys], start_date, end_date, max_workers, report)
+        return {(t, days): df for t, df in frames.items()}
+
+    frames = get_price_fetches().do_many([(t, days) for t in tickers], fetch)
+    # Tickers fetched by another session are only ready once do_many returns
+    for ticker in tickers:
+        if ticker not in reported:
+            report(ticker)
+    return {t: frames[(t, days)] for t in tickers}
+
+def _fetch_batch_price_history(tickers, start_date, end_date, max_workers, on_frame=None):
+    plan = _price_cache_plan(tickers, start_date)
+    frames = {}
+
+    def finish(ticker, fresh):
+        """Merge a ticker's new bars into the cache and read back its window"""
+        if not _store_prices(ticker, fresh, start_date, plan[ticker][1]):
+            _store_prices(ticker, _fetch_history(ticker, start_date, end_date), start_date)
+        frames[ticker] = _read_cached_prices(ticker, start_date, end_date)
+        if on_frame:
+            on_frame(ticker)
+
+    # Tickers last refreshed on the same day share one download; ones already
+    # current are served from the cache
+    groups = {}
+    for ticker, (fetch_from, _) in plan.items():
+        if fetch_from is None:
+            finish(ticker, None)
         else:
-            gap_pct = None
+            groups.setdefault(fetch_from, []).append(ticker)
+
+    missing = []
+    for fetch_from, group in groups.items():
+        batch = _download_batch(group, fetch_from, end_date, max_workers)
+        for ticker in group:
+            df = batch.get(ticker)
+            if df is None:
+                missing.append(ticker)
+            else:
+                finish(ticker, df)
 
-        return {
+    if missing:
+        workers = max(1, min(max_workers, len(missing)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_fetch_history, t, plan[t][0], end_date): t for t in missing}
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+
+    return {ticker: frames.get(ticker) for ticker in tickers}
+
+def align_price_matrix(frames, tickers):
+    """
+    Stack per-ticker OHLC frames into (bars x tickers) High/Low/Close arrays.
+    - Frames are aligned on the union of their dates, then each column's own
+      bars are packed to the bottom so the last row is every ticker's latest
+      bar. Dates one ticker lacks (e.g. another exchange's holiday) become
+      leading NaN rows instead of holes inside its rolling windows
+    """
+    present = [(col, frames[t]) for col, t in enumerate(tickers) if frames.get(t) is not None]
+    stamps = [pd.DatetimeIndex(df.index).asi8 for _, df in present]
+    dates = np.unique(np.concatenate(stamps)) if stamps else np.empty(0, dtype=np.int64)
+
+    matrix = np.full((3, len(dates), len(tickers)), np.nan)
+    for (col, df), df_stamps in zip(present, stamps):
+        rows = np.searchsorted(dates, df_stamps)
+        fields = [df.columns.get_loc(field) for field in ('High', 'Low', 'Close')]
+        matrix[:, rows, col] = df.to_numpy(dtype=float)[:, fields].T
+    high, low, close = matrix
+
+    has_bar = ~(np.isnan(high) & np.isnan(low) & np.isnan(close))
+    order = np.argsort(has_bar, axis=0, kind='stable')
+    return (
+        np.take_along_axis(high, order, axis=0),
+        np.take_along_axis(low, order, axis=0),
+        np.take_along_axis(close, order, axis=0),
+    )
+
+def compute_batch_summaries(frames, tickers):
+    """
+    Portfolio summary rows for many tickers in one vectorized pass.
+    - frames maps ticker -> OHLC frame (as from get_batch_price_history)
+    - Returns one row per ticker (Ticker, Current Price, 150-Day MA, Gap %,
+      ATR (14), Stop Loss), None where a ticker has no data
+    """
+    if not tickers:
+        return []
+
+    high, low, close = align_price_matrix(frames, tickers)
+    if len(close) == 0:
+        return [None] * len(tickers)
+
+    ma150 = rolling_mean(close, 150)[-1]
+    atr = atr_kernel(high, low, close, 14)[-1]
+    price = close[-1]
+    stop_loss = calculate_stop_loss(ma150, atr)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gap_pct = (price - ma150) / ma150 * 100
+
+    results = []
+    for col, ticker in enumerate(tickers):
+        df = frames.get(ticker)
+        if df is None or df.empty:
+            results.append(None)
+            continue
+        has_gap = not np.isnan(ma150[col]) and ma150[col] != 0
+        results.append({
             'Ticker': ticker,
-            'Current Price': current_price,
-            '150-Day MA': ma150,
-            'Gap %': gap_pct,
-            'ATR (14)': atr,
-            'Stop Loss': stop_loss
-        }
-    except Exception as e:
+            'Current Price': price[col],
+            '150-Day MA': ma150[col],
+            'Gap %': gap_pct[col] if has_gap else None,
+            'ATR (14)': atr[col],
+            'Stop Loss': stop_loss[col] if not np.isnan(stop_loss[col]) else None
+        })
+    return results
+
+def market_data_version(now=None):
+    """
+    Cache key component that changes only when new bars can exist.
+    - During regular hours: the session date plus an INTRADAY_REFRESH_MINUTES bucket
+    - Outside them: the date of the last completed session, so data stays
+      cached overnight and over weekends
+    """
+    now = now or datetime.now(MARKET_TIMEZONE)
+    hour_minute = (now.hour, now.minute)
+    session_day = now.date()
+
+    if now.weekday() < 5 and MARKET_OPEN <= hour_minute < MARKET_CLOSE:
+        bucket = (now.hour * 60 + now.minute) // INTRADAY_REFRESH_MINUTES
+        return f"{session_day.isoformat()}/{bucket}"
+
+    if now.weekday() >= 5 or hour_minute < MARKET_OPEN:
+        session_day -= timedelta(days=1)
+        while session_day.weekday() >= 5:
+            session_day -= timedelta(days=1)
+    return session_day.isoformat()
+
+@st.cache_data(max_entries=MEMO_MAX_ENTRIES, show_spinner=False)
+def _memo_stock_data(ticker, days, data_version):
+    return get_stock_data(ticker, days)
+
+@st.cache_data(max_entries=MEMO_MAX_ENTRIES, ttl=SYMBOL_LOOKUP_TTL, show_spinner=False)
+def _memo_resolve_ticker(input_text):
+    return resolve_ticker(input_text)
+
+def cached_stock_data(ticker, days=400):
+    """
+    get_stock_data memoized per (ticker, window, market_data_version()).
+    - Reruns within the same trading bucket reuse the frame without any I/O
+    - Failed fetches are dropped from the memo so the next rerun retries
+    """
+    version = market_data_version()
+    df = _memo_stock_data(ticker, days, version)
+    if df is None:
+        _memo_stock_data.clear(ticker, days, version)
+    return df
+
+def cached_resolve_ticker(input_text):
+    """resolve_ticker memoized on the normalized input"""
+    return _memo_resolve_ticker(input_text.upper().strip())
+
+def invalidate_market_data(ticker=None, days=400):
+    """
+    Drop memoized data for one ticker, or everything if no ticker is given,
+    and make the next fetch top up the price cache from the network
+    """
+    _expire_cached_prices(ticker)
+    if ticker is None:
+        _memo_stock_data.clear()
+        _memo_resolve_ticker.clear()
+    else:
+        _memo_stock_data.clear(ticker, days, market_data_version())
+
+def _resolve_or_none(input_ticker):
+    try:
+        return cached_resolve_ticker(input_ticker)
+    except Exception:
         return None
 
+def analyze_portfolio(tickers, max_workers=PORTFOLIO_MAX_WORKERS, on_progress=None):
+    """
+    Summarize every ticker in a portfolio.
+    - Company names are resolved in parallel on a bounded thread pool
+    - Price history is downloaded in batches of PORTFOLIO_BATCH_SIZE
+      and indicators are computed for all tickers at once
+    - on_progress(stage, done, total) is called as each name is resolved
+      (stage 'resolve', out of the input tickers) and then as each symbol's
+      prices are ready (stage 'fetch', out of the distinct symbols)
+    - Results are returned in the same order as the input tickers
+    """
+    if not tickers:
+        return []
+
+    workers = max(1, min(max_workers, len(tickers)))
+    symbols = [None] * len(tickers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_resolve_or_none, t): i for i, t in enumerate(tickers)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            symbols[futures[future]] = future.result()
+            if on_progress:
+                on_progress('resolve', done, len(tickers))
+
+    unique_symbols = [s for s in dict.fromkeys(symbols) if s]
+    fetched = 0
+
+    def report_frame(ticker):
+        nonlocal fetched
+        fetched += 1
+        if on_progress:
+            on_progress('fetch', fetched, len(unique_symbols))
+
+    frames = {}
+    for start in range(0, len(unique_symbols), PORTFOLIO_BATCH_SIZE):
+        batch = unique_symbols[start:start + PORTFOLIO_BATCH_SIZE]
+        frames.update(get_batch_price_history(batch, max_workers=max_workers, on_frame=report_frame))
+
+    summaries = dict(zip(unique_symbols, compute_batch_summaries(frames, unique_symbols)))
+    return [summaries.get(symbol) if symbol else None for symbol in symbols]
+
+def list_universes():
+    """Names of the built-in screener universes (index memberships in the symbol index)"""
+    symbols = load_symbol_index()['symbols'].values()
+    return sorted({index for entry in symbols for index in entry.get('indices', [])})
+
+def get_universe_tickers(name):
+    """Constituents of a built-in universe, in symbol index order"""
+    symbols = load_symbol_index()['symbols']
+    return [ticker for ticker, entry in symbols.items() if name in entry.get('indices', [])]
+
+def read_universe_file(file):
+    """
+    Read a user-supplied universe: CSV/TXT with symbols separated by commas,
+    whitespace or newlines (or a Ticker/Symbol column), or an Excel workbook
+    as in read_excel_tickers.
+    - Share-class dots become dashes (BRK.B -> BRK-B), as Yahoo spells them
+    """
+    name = str(getattr(file, 'name', file)).lower()
+    if name.endswith(('.xlsx', '.xls')):
+        tickers = read_excel_tickers(file)
+    else:
+        try:
+            if hasattr(file, 'getvalue'):
+                raw = file.getvalue()
+            else:
+                with open(file, 'rb') as f:
+                    raw = f.read()
+            text = raw.decode('utf-8-sig', errors='replace')
+        except Exception as e:
+            st.error(f"Error reading universe file: {e}")
+            return []
+
+        rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+        ticker_col = find_ticker_column(rows[0]) if rows else None
+        if ticker_col is not None:
+            idx = rows[0].index(ticker_col)
+            values = [row[idx] for row in rows[1:] if len(row) > idx]
+        else:
+            values = re.split(r'[\s,;]+', text)
+        tickers = extract_tickers_from_symbols(pd.Series(values, dtype=object))
+
+    return list(dict.fromkeys(t.replace('.', '-') for t in tickers))
+
+def run_screener(tickers, max_workers=PORTFOLIO_MAX_WORKERS, on_progress=None):
+    """
+    Summary metrics for every constituent of a universe.
+    - Universe entries are taken as symbols, so no name resolution happens
+    - Same batched fetch, price cache and vectorized indicators as analyze_portfolio
+    - Returns (DataFrame of summary rows sorted by Gap %, tickers without data)
+    """
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    frames = {}
+    for start in range(0, len(tickers), PORTFOLIO_BATCH_SIZE):
+        batch = tickers[start:start + PORTFOLIO_BATCH_SIZE]
+        frames.update(get_batch_price_history(batch, max_workers=max_workers))
+        if on_progress:
+            on_progress(start + len(batch), len(tickers))
+
+    summaries = compute_batch_summaries(frames, tickers)
+    rows = [row for row in summaries if row]
+    failed = [t for t, row in zip(tickers, summaries) if not row]
+
+    columns = ['Ticker', 'Current Price', '150-Day MA', 'Gap %', 'ATR (14)', 'Stop Loss']
+    results = pd.DataFrame(rows, columns=columns)
+    results['Gap %'] = pd.to_numeric(results['Gap %'])
+    results['Stop Loss'] = pd.to_numeric(results['Stop Loss'])
+    return results.sort_values('Gap %', na_position='last', ignore_index=True), failed
+
+def filter_screen(results, condition, gap_pct):
+    """
+    Apply a screen to run_screener() results.
+    - 'Below 150-MA': Gap % at or below gap_pct (e.g. -5 for more than 5% below)
+    - 'Above 150-MA': Gap % at or above gap_pct
+    - anything else keeps every row
+    """
+    if condition == 'Below 150-MA':
+        return results[results['Gap %'] <= gap_pct]
+    if condition == 'Above 150-MA':
+        return results[results['Gap %'] >= gap_pct]
+    return results
+
+def build_company_name_pattern(names):
+    """
+    Compile company names into a single regex shaped like a prefix trie.
+    - Names sharing a prefix share a branch, so the text is scanned once
+      no matter how many names there are
+    - Only whole words match (META is not found inside METAL)
+    """
+    trie = {}
+    for name in names:
+        node = trie
+        for ch in name:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def to_regex(node):
+        branches = [re.escape(ch) + to_regex(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A name ending here may also continue into a longer one
+        return f'(?:{body})?' if '' in node else body
+
+    return re.compile(r'(?<![A-Z0-9])(?:' + to_regex(trie) + r')(?![A-Z0-9])')
+
+COMPANY_NAME_PATTERN = build_company_name_pattern(COMPANY_TO_TICKER)
+
 def extract_tickers_from_text(text):
     """Extract tickers and company names from text"""
     common_words = {'A', 'I', 'AM', 'AN', 'AS', 'AT', 'BE', 'BY', 'DO', 'GO', 'HE', 'IF',
@@ -486,56 +1840,208 @@ def extract_tickers_from_text(text):
                    'CAN', 'HAD', 'HER', 'WAS', 'ONE', 'OUR', 'OUT', 'PDF', 'USD', 'EUR',
                    'INC', 'CORP', 'LTD', 'LLC', 'CO', 'COMPANY'}
 
-    # Find potential tickers (1-5 uppercase letters)
-    potential_tickers = re.findall(r'\b[A-Z]{1,5}\b', text.upper())
-
-    # Also find company names from our mapping
-    found_items = []
     text_upper = text.upper()
 
-    for company in COMPANY_TO_TICKER.keys():
-        if company in text_upper:
-            found_items.append(COMPANY_TO_TICKER[company])
+    # Find potential tickers (1-5 uppercase letters)
+    potential_tickers = re.findall(r'\b[A-Z]{1,5}\b', text_upper)
+
+    # Also find company names from our mapping, in one pass over the text
+    company_hits = [COMPANY_TO_TICKER[m.group()] for m in COMPANY_NAME_PATTERN.finditer(text_upper)]
 
     # Add tickers that aren't common words
-    for t in potential_tickers:
-        if t not in common_words and t not in found_items:
-            found_items.append(t)
+    ticker_hits = [t for t in potential_tickers if t not in common_words]
 
     # Remove duplicates while preserving order
-    seen = set()
-    unique_items = []
-    for t in found_items:
-        if t not in seen:
-            seen.add(t)
-            unique_items.append(t)
+    return list(dict.fromkeys(company_hits + ticker_hits))
+
+def find_ticker_column(columns):
+    """Return the first column whose header names it as a ticker/symbol column"""
+    for col in columns:
+        if str(col).strip().upper() in TICKER_COLUMN_HEADERS:
+            return col
+    return None
+
+def extract_tickers_from_symbols(values):
+    """
+    Extract tickers from the cells of a Ticker/Symbol column.
+    - Cells that look like symbols are taken as-is
+    - Anything else (company names, notes) goes through text extraction
+    """
+    values = values.dropna().astype(str).str.strip().str.upper()
+    values = values[values != '']
+    is_symbol = values.str.fullmatch(r'[A-Z][A-Z0-9.\-]{0,9}')
+    tickers = values[is_symbol].tolist()
+    tickers += extract_tickers_from_text('\n'.join(values[~is_symbol]))
+    return list(dict.fromkeys(tickers))
+
+def extract_tickers_from_frame(df):
+    """
+    Extract tickers from a spreadsheet.
+    - If a Ticker/Symbol column exists, only that column is read
+    - Otherwise all cells are joined column by column and scanned in one pass
+    """
+    ticker_col = find_ticker_column(df.columns)
+    if ticker_col is not None:
+        return extract_tickers_from_symbols(df[ticker_col])
 
-    return unique_items
+    text = '\n'.join(df[col].dropna().astype(str).str.cat(sep='\n') for col in df.columns)
+    return extract_tickers_from_text(text)
 
-def read_excel_tickers(file):
+def _file_size(file):
+    if hasattr(file, 'size'):
+        return file.size
+    if hasattr(file, 'getbuffer'):
+        return file.getbuffer().nbytes
+    return os.path.getsize(file)
+
+def iter_excel_tickers_streaming(file):
+    """
+    Read every sheet of an .xlsx lazily with openpyxl's read-only mode.
+    - Yields the tickers first seen in each block of EXCEL_STREAMING_CHUNK_ROWS rows
+    - The first row of a sheet is its header; a Ticker/Symbol header limits
+      that sheet to the one column, as in extract_tickers_from_frame
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        seen = set()
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            ticker_col = find_ticker_column(['' if h is None else h for h in header])
+            ticker_idx = header.index(ticker_col) if ticker_col is not None else None
+
+            while True:
+                chunk = [row for _, row in zip(range(EXCEL_STREAMING_CHUNK_ROWS), rows)]
+                if not chunk:
+                    break
+                if ticker_idx is not None:
+                    cells = pd.Series([row[ticker_idx] for row in chunk if len(row) > ticker_idx])
+                    tickers = extract_tickers_from_symbols(cells)
+                else:
+                    text = '\n'.join(str(cell) for row in chunk for cell in row if cell is not None)
+                    tickers = extract_tickers_from_text(text)
+                new_tickers = [t for t in tickers if t not in seen]
+                seen.update(new_tickers)
+                yield new_tickers
+    finally:
+        workbook.close()
+
+def read_excel_tickers(file, on_progress=None):
+    """
+    Collect tickers from every sheet of a workbook.
+    - Large .xlsx files (EXCEL_STREAMING_MIN_BYTES) are streamed with openpyxl,
+      calling on_progress(tickers_so_far) as rows add new ones
+    - Smaller files (and legacy .xls) are read with pandas
+    """
     try:
-        df = pd.read_excel(file)
+        name = str(getattr(file, 'name', file)).lower()
+        if name.endswith('.xlsx') and _file_size(file) >= EXCEL_STREAMING_MIN_BYTES:
+            tickers = []
+            for chunk_tickers in iter_excel_tickers_streaming(file):
+                if chunk_tickers:
+                    tickers.extend(chunk_tickers)
+                    if on_progress:
+                        on_progress(tickers)
+            return tickers
+
+        sheets = pd.read_excel(file, sheet_name=None)
         tickers = []
-        for col in df.columns:
-            col_values = df[col].dropna().astype(str).tolist()
-            for val in col_values:
-                extracted = extract_tickers_from_text(val)
-                tickers.extend(extracted)
+        for df in sheets.values():
+            tickers.extend(extract_tickers_from_frame(df))
         return list(dict.fromkeys(tickers))
     except Exception as e:
         st.error(f"Error reading Excel file: {e}")
         return []
 
-def read_pdf_tickers(file):
+def _iter_pdf_page_tickers(file):
+    """Yield the tickers on each page, releasing the page's layout cache as it goes"""
+    with pdfplumber.open(file) as pdf:
+        for page in pdf.pages:
+            text = page.extract_text() or ""
+            page.close()
+            yield extract_tickers_from_text(text)
+
+@contextmanager
+def _hidden_main_module():
+    """
+    Swap sys.modules['__main__'] for an empty stub while spawned children start.
+    - Under streamlit run this script is __main__ with a __file__, and spawn
+      re-runs __main__ in every child, so each worker would import streamlit,
+      yfinance and plotly and render the app. A stub without __file__ or
+      __spec__ gives spawn nothing to re-run
+    """
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+def _iter_pdf_page_tickers_parallel(data, page_count, workers):
+    """
+    Split the page range across a process pool and yield per-page tickers in page order.
+    - Workers run pdf_pages, not this module, under spawn: forking the
+      multi-threaded Streamlit server could copy locks other threads hold
+    - Workers are started (on submit) with __main__ hidden, see _hidden_main_module
+    - The document reaches each worker once, through the pool initializer;
+      tasks carry only page numbers. Workers return page text and tickers
+      are extracted here
+    """
+    chunk_size = max(1, -(-page_count // (workers * 4)))
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=pdf_pages.init_worker, initargs=(data,)) as executor:
+        with _hidden_main_module():
+            futures = [
+                executor.submit(pdf_pages.extract_page_range, first, min(first + chunk_size - 1, page_count))
+                for first in range(1, page_count + 1, chunk_size)
+            ]
+        for future in futures:
+            for text in future.result():
+                yield extract_tickers_from_text(text)
+
+def iter_pdf_tickers(file, workers=PDF_PROCESS_POOL_WORKERS):
+    """
+    Extract tickers from a PDF page by page.
+    - Yields the list of tickers first seen on each page
+    - Documents with PDF_PROCESS_POOL_MIN_PAGES or more pages are parsed on a
+      process pool; shorter ones stay in-process to skip pool startup
+    """
+    if hasattr(file, 'read'):
+        file.seek(0)
+        data = file.read()
+    else:
+        with open(file, 'rb') as f:
+            data = f.read()
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        page_count = len(pdf.pages)
+
+    if workers > 1 and page_count >= PDF_PROCESS_POOL_MIN_PAGES:
+        page_tickers = _iter_pdf_page_tickers_parallel(data, page_count, workers)
+    else:
+        page_tickers = _iter_pdf_page_tickers(io.BytesIO(data))
+
+    seen = set()
+    for tickers in page_tickers:
+        new_tickers = [t for t in tickers if t not in seen]
+        seen.update(new_tickers)
+        yield new_tickers
+
+def read_pdf_tickers(file, on_progress=None):
+    """Collect tickers from a PDF, calling on_progress(tickers_so_far) as pages add new ones"""
     if not PDF_SUPPORT:
         st.error("PDF support not available.")
         return []
     try:
-        text = ""
-        with pdfplumber.open(file) as pdf:
-            for page in pdf.pages:
-                text += page.extract_text() or ""
-        return extract_tickers_from_text(text)
+        tickers = []
+        for page_tickers in iter_pdf_tickers(file):
+            if page_tickers:
+                tickers.extend(page_tickers)
+                if on_progress:
+                    on_progress(tickers)
+        return tickers
     except Exception as e:
         st.error(f"Error reading PDF file: {e}")
         return []
@@ -556,7 +2062,127 @@ def read_word_tickers(file):
         st.error(f"Error reading Word file: {e}")
         return []
 
-def create_chart(df, ticker):
+def chart_point_budget(width_px=CHART_WIDTH_PX, points_per_pixel=CHART_POINTS_PER_PIXEL):
+    """Most points a chart trace should carry for a plot width_px pixels wide"""
+    return max(2, int(width_px * points_per_pixel))
+
+def downsample_ohlc(df, max_bars):
+    """
+    Aggregate OHLCV bars into at most max_bars equal-count buckets.
+    - Each bucket keeps its first Open, highest High, lowest Low, last Close
+      and total Volume, stamped with its first bar's date
+    """
+    if len(df) <= max_bars:
+        return df
+
+    starts = np.arange(max_bars) * len(df) // max_bars
+    ends = np.append(starts[1:], len(df)) - 1
+    return pd.DataFrame({
+        'Open': df['Open'].to_numpy()[starts],
+        'High': np.maximum.reduceat(df['High'].to_numpy(dtype=float), starts),
+        'Low': np.minimum.reduceat(df['Low'].to_numpy(dtype=float), starts),
+        'Close': df['Close'].to_numpy()[ends],
+        'Volume': np.add.reduceat(df['Volume'].to_numpy(dtype=float), starts),
+    }, index=df.index[starts])
+
+def lttb_indices(y, max_points):
+    """
+    Largest-Triangle-Three-Buckets: positions of at most max_points samples of
+    y that preserve the line's visual shape. Bars are taken as evenly spaced;
+    NaN samples (e.g. before the MA window fills) are left out
+    """
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= max_points:
+        return valid
+    if max_points < 3:
+        return valid[[0, -1]][:max_points]
+
+    x = valid.astype(float)
+    values = y[valid]
+    edges = 1 + np.arange(max_points - 1) * (len(valid) - 2) // (max_points - 2)
+    edges[-1] = len(valid) - 1
+
+    picked = [0]
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else len(valid)
+        avg_x, avg_y = x[nxt_lo:nxt_hi].mean(), values[nxt_lo:nxt_hi].mean()
+        ax, ay = x[picked[-1]], values[picked[-1]]
+        areas = np.abs((ax - avg_x) * (values[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y - ay))
+        picked.append(lo + int(np.argmax(areas)))
+    picked.append(len(valid) - 1)
+    return valid[picked]
+
+def _line_points(series, max_points):
+    """x/y for a line trace, LTTB-downsampled when max_points is set"""
+    if max_points is None:
+        return series.index, series
+    positions = lttb_indices(series.to_numpy(dtype=float), max_points)
+    return series.index[positions], series.iloc[positions]
+
+def _epoch_ms(index):
+    """
+    Dates as float epoch milliseconds, which Plotly date axes accept as numbers.
+    - Converted with as_unit, since indexes aren't always nanoseconds (a
+      parquet fixture can load as datetime64[us] or [ms])
+    """
+    return pd.DatetimeIndex(index).as_unit('ms').asi8.astype(float)
+
+def _webgl_candle_traces(candles):
+    """
+    Candles drawn with WebGL error bars (Plotly has no WebGL candlestick).
+    - Per direction, one trace of high-low wicks and one of thicker open-close
+      bodies, each a symmetric error bar around the segment's midpoint, so a
+      candle costs three floats per trace instead of a date string and four prices
+    - Prices ship as float32 (ample for display); dates need float64
+    """
+    x = _epoch_ms(candles.index)
+    prices = {field: candles[field].to_numpy(dtype=float) for field in ('Open', 'High', 'Low', 'Close')}
+    body_width = max(1.0, min(8.0, CHART_WIDTH_PX * 0.6 / max(len(x), 1)))
+
+    traces = []
+    rising = prices['Close'] >= prices['Open']
+    for mask, color in ((rising, '#22c55e'), (~rising, '#ef4444')):
+        for a, b, width in (('Low', 'High', 1.0), ('Open', 'Close', body_width)):
+            mid = ((prices[a][mask] + prices[b][mask]) / 2).astype(np.float32)
+            half = (np.abs(prices[b][mask] - prices[a][mask]) / 2).astype(np.float32)
+            traces.append(go.Scattergl(
+                x=x[mask],
+                y=mid,
+                mode='markers',
+                marker=dict(size=0, color=color),
+                error_y=dict(type='data', array=half, color=color, thickness=width, width=0),
+                name='Price',
+                legendgroup='price',
+                showlegend=not traces,
+                hoverinfo='skip'
+            ))
+    return traces
+
+def create_chart(df, ticker, max_points=None, webgl=False):
+    """
+    Price/MA/stop-loss and ATR chart.
+    - max_points caps every trace: candles are bucketed with downsample_ohlc
+      and lines thinned with LTTB. None draws every bar
+    - Indicators come from the full-resolution frame, so downsampling never
+      changes their values, only which of them are drawn
+    - webgl draws every trace with Scattergl on numeric epoch-ms x values and
+      float32 y values, so the figure ships as compact typed arrays instead of
+      date strings and float64 prices
+    """
+    candles = downsample_ohlc(df, max_points) if max_points else df
+    stop_loss = calculate_stop_loss(df['MA150'], df['ATR'])
+    ma_x, ma_y = _line_points(df['MA150'], max_points)
+    stop_x, stop_y = _line_points(stop_loss, max_points)
+    atr_x, atr_y = _line_points(df['ATR'], max_points)
+
+    line_trace = go.Scatter
+    if webgl:
+        line_trace = go.Scattergl
+        ma_x, ma_y = _epoch_ms(ma_x), ma_y.to_numpy(dtype=np.float32)
+        stop_x, stop_y = _epoch_ms(stop_x), stop_y.to_numpy(dtype=np.float32)
+        atr_x, atr_y = _epoch_ms(atr_x), atr_y.to_numpy(dtype=np.float32)
+
     fig = make_subplots(
         rows=2, cols=1,
         shared_xaxes=True,
@@ -565,37 +2191,52 @@ def create_chart(df, ticker):
         subplot_titles=(None, None)
     )
 
+    if webgl:
+        for trace in _webgl_candle_traces(candles):
+            fig.add_trace(trace, row=1, col=1)
+    else:
+        fig.add_trace(
+            go.Candlestick(
+                x=candles.index,
+                open=candles['Open'],
+                high=candles['High'],
+                low=candles['Low'],
+                close=candles['Close'],
+                name='Price',
+                increasing_line_color='#22c55e',
+                decreasing_line_color='#ef4444',
+                increasing_fillcolor='#22c55e',
+                decreasing_fillcolor='#ef4444'
+            ),
+            row=1, col=1
+        )
+
     fig.add_trace(
-        go.Candlestick(
-            x=df.index,
-            open=df['Open'],
-            high=df['High'],
-            low=df['Low'],
-            close=df['Close'],
-            name='Price',
-            increasing_line_color='#22c55e',
-            decreasing_line_color='#ef4444',
-            increasing_fillcolor='#22c55e',
-            decreasing_fillcolor='#ef4444'
+        line_trace(
+            x=ma_x,
+            y=ma_y,
+            mode='lines',
+            name='150-Day MA',
+            line=dict(color='#8b5cf6', width=3)
         ),
         row=1, col=1
     )
 
     fig.add_trace(
-        go.Scatter(
-            x=df.index,
-            y=df['MA150'],
+        line_trace(
+            x=stop_x,
+            y=stop_y,
             mode='lines',
-            name='150-Day MA',
-            line=dict(color='#8b5cf6', width=3)
+            name='Stop Loss',
+            line=dict(color='#ef4444', width=2, dash='dash')
         ),
         row=1, col=1
     )
 
     fig.add_trace(
-        go.Scatter(
-            x=df.index,
-            y=df['ATR'],
+        line_trace(
+            x=atr_x,
+            y=atr_y,
             mode='lines',
             name='ATR (14)',
             fill='tozeroy',
@@ -624,8 +2265,10 @@ def create_chart(df, ticker):
         font=dict(family="Plus Jakarta Sans", color='#475569')
     )
 
-    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='rgba(0,0,0,0.05)', showline=False)
+    fig.update_xaxes(type='date', showgrid=True, gridwidth=1, gridcolor='rgba(0,0,0,0.05)', showline=False)
     fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='rgba(0,0,0,0.05)', showline=False)
+    if webgl:
+        fig.update_yaxes(hoverformat='.2f')
 
     fig.add_annotation(
         text=f"<b>{ticker}</b> Price & 150-Day MA",
@@ -645,30 +2288,139 @@ def create_chart(df, ticker):
 
     return fig
 
-def create_excel_download(df):
-    """Create Excel file for download"""
+@st.cache_resource(max_entries=CHART_CACHE_MAX_ENTRIES, show_spinner=False)
+def _cached_chart(ticker, first_bar, last_bar, last_close, bars, max_points, webgl, _df):
+    return create_chart(_df, ticker, max_points=max_points, webgl=webgl)
+
+def cached_chart(df, ticker, max_points=None, webgl=False):
+    """
+    create_chart memoized on a fingerprint of the data and the chart style.
+    - The key is (ticker, first/last bar date, last close, bar count,
+      max_points, webgl), so reruns from unrelated widgets reuse the figure
+      while a new or updated bar rebuilds it
+    - Figures are shared between sessions, not copied; don't modify them
+    """
+    return _cached_chart(
+        ticker,
+        df.index[0].isoformat(),
+        df.index[-1].isoformat(),
+        float(df['Close'].iloc[-1]),
+        len(df),
+        max_points,
+        webgl,
+        df
+    )
+
+def _excel_cell_values(series):
+    """Python cell values for a column (NaN/NaT become blanks) and their widest text"""
+    values = series.astype(object).where(series.notna(), None).tolist()
+    width = max((len(str(v)) for v in values if v is not None), default=0)
+    return values, width
+
+def create_excel_download(df, sheet_name='Portfolio Analysis'):
+    """
+    Create Excel file for download.
+    - Uses openpyxl's write-only mode, so rows are streamed to the file
+      instead of kept as styled cell objects for the whole sheet
+    - Column widths are measured while converting each column's values,
+      since write-only sheets need them before the first row
+    """
+    columns = []
+    widths = []
+    for col in df.columns:
+        values, width = _excel_cell_values(df[col])
+        columns.append(values)
+        widths.append(max(width, len(str(col))) + 2)
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet_name)
+    for idx, width in enumerate(widths, start=1):
+        worksheet.column_dimensions[get_column_letter(idx)].width = width
+
+    # Same header look as DataFrame.to_excel
+    thin = Side(style='thin')
+    header = []
+    for col in df.columns:
+        cell = WriteOnlyCell(worksheet, value=str(col))
+        cell.font = Font(bold=True)
+        cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        cell.alignment = Alignment(horizontal='center', vertical='top')
+        header.append(cell)
+    worksheet.append(header)
+
+    for row in zip(*columns):
+        worksheet.append(row)
+
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Portfolio Analysis')
-
-        # Auto-adjust column widths
-        worksheet = writer.sheets['Portfolio Analysis']
-        for idx, col in enumerate(df.columns):
-            max_length = max(
-                df[col].astype(str).map(len).max(),
-                len(col)
-            ) + 2
-            worksheet.column_dimensions[chr(65 + idx)].width = max_length
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+def create_csv_download(df):
+    """Create CSV file for download"""
+    return df.to_csv(index=False).encode('utf-8')
 
+def create_parquet_download(df):
+    """Create Parquet file for download (requires pyarrow)"""
+    output = io.BytesIO()
+    df.to_parquet(output, index=False, engine='pyarrow')
     output.seek(0)
     return output
 
+def create_arrow_download(df):
+    """Create Arrow IPC (file format) for download (requires pyarrow)"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+# label -> (file extension, MIME type, builder, needs pyarrow)
+EXPORT_FORMATS = {
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', create_excel_download, False),
+    'CSV': ('csv', 'text/csv', create_csv_download, False),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet', create_parquet_download, True),
+    'Arrow': ('arrow', 'application/vnd.apache.arrow.file', create_arrow_download, True),
+}
+
+def render_export_buttons(df, file_stem, key_prefix, sheet_name='Portfolio Analysis'):
+    """
+    One download button per export format.
+    - Files are built only when their button is clicked
+    - Parquet/Arrow are offered only when pyarrow is installed
+    - Clicking doesn't rerun the app, so the results stay on screen
+    """
+    formats = [(label, spec) for label, spec in EXPORT_FORMATS.items() if ARROW_SUPPORT or not spec[3]]
+    for col, (label, (extension, mime, build, _)) in zip(st.columns(len(formats)), formats):
+        if build is create_excel_download:
+            data = lambda build=build: build(df, sheet_name=sheet_name)
+        else:
+            data = lambda build=build: build(df)
+        with col:
+            st.download_button(
+                label=f"📥 {label}",
+                data=data,
+                file_name=f"{file_stem}.{extension}",
+                mime=mime,
+                on_click="ignore",
+                width="stretch",
+                key=f"{key_prefix}_{extension}"
+            )
+
 # ============ MAIN APP ============
 
 st.markdown('<h1 class="main-title">Stock <span>Analyzer</span> Pro</h1>', unsafe_allow_html=True)
 st.markdown('<p class="sub-title">Real-time analysis with 150-Day Moving Average & ATR</p>', unsafe_allow_html=True)
 
-tab1, tab2 = st.tabs(["📊 Single Stock", "📁 Portfolio"])
+# Surface a misconfigured market data backend once, instead of as a
+# "Could not fetch" on every lookup
+try:
+    get_market_data_provider()
+except (ValueError, OSError) as e:
+    st.error(f"❌ {e}")
+    st.stop()
+
+tab1, tab2, tab3 = st.tabs(["📊 Single Stock", "📁 Portfolio", "🔎 Screener"])
 
 with tab1:
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -682,8 +2434,8 @@ with tab1:
 
     if ticker_input:
         with st.spinner(f"Loading {ticker_input}..."):
-            ticker = resolve_ticker(ticker_input)
-            df, info = get_stock_data(ticker)
+            ticker = cached_resolve_ticker(ticker_input)
+            df = cached_stock_data(ticker)
 
         if df is not None and not df.empty:
             current_price = df['Close'].iloc[-1]
@@ -691,7 +2443,7 @@ with tab1:
             atr = df['ATR'].iloc[-1]
             stop_loss = calculate_stop_loss(ma150, atr)
 
-            company_name = info.get('longName', ticker) if info else ticker
+            company_name = get_company_name(ticker)
             st.markdown(f'<div class="company-name">{company_name}</div>', unsafe_allow_html=True)
 
             col1, col2, col3, col4 = st.columns(4)
@@ -744,22 +2496,50 @@ with tab1:
 
             st.markdown("<br>", unsafe_allow_html=True)
 
-            fig = create_chart(df, ticker)
+            # Long histories are downsampled to the point budget; zooming into a
+            # date range or asking for full resolution redraws from every bar
+            chart_df = df
+            point_budget = chart_point_budget()
+            if len(df) > point_budget:
+                zoom_col, full_col = st.columns([4, 1])
+                with zoom_col:
+                    zoom_start, zoom_end = st.select_slider(
+                        "Chart range",
+                        options=list(df.index.date),
+                        value=(df.index[0].date(), df.index[-1].date()),
+                        key="chart_range"
+                    )
+                with full_col:
+                    full_resolution = st.toggle("Full resolution", key="chart_full_res")
+                chart_df = df.loc[str(zoom_start):str(zoom_end)]
+                if full_resolution:
+                    point_budget = None
+
+            webgl = st.toggle("⚡ WebGL chart", key="chart_webgl", help="Faster rendering for long histories")
+            fig = cached_chart(chart_df, ticker, max_points=point_budget, webgl=webgl)
             st.plotly_chart(fig, use_container_width=True)
 
-            with st.expander("📊 Key Statistics"):
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    high_52 = info.get('fiftyTwoWeekHigh') if info else None
-                    st.metric("52-Week High", f"${high_52:.2f}" if high_52 else "N/A")
-                with col2:
-                    low_52 = info.get('fiftyTwoWeekLow') if info else None
-                    st.metric("52-Week Low", f"${low_52:.2f}" if low_52 else "N/A")
-                with col3:
-                    st.metric("Volume", f"{df['Volume'].iloc[-1]:,.0f}")
-                with col4:
-                    avg_vol = info.get('averageVolume') if info else None
-                    st.metric("Avg Volume", f"{avg_vol:,.0f}" if avg_vol else "N/A")
+            # Metadata is only fetched once the expander is opened
+            key_stats = st.expander("📊 Key Statistics", key="key_stats", on_change="rerun")
+            if key_stats.open:
+                with key_stats:
+                    info = get_company_info(ticker)
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        high_52 = info.get('fiftyTwoWeekHigh')
+                        st.metric("52-Week High", f"${high_52:.2f}" if high_52 else "N/A")
+                    with col2:
+                        low_52 = info.get('fiftyTwoWeekLow')
+                        st.metric("52-Week Low", f"${low_52:.2f}" if low_52 else "N/A")
+                    with col3:
+                        st.metric("Volume", f"{df['Volume'].iloc[-1]:,.0f}")
+                    with col4:
+                        avg_vol = info.get('averageVolume')
+                        st.metric("Avg Volume", f"{avg_vol:,.0f}" if avg_vol else "N/A")
+
+            if st.button("🔄 Refresh Data", key="refresh_single"):
+                invalidate_market_data(ticker)
+                st.rerun()
         else:
             st.error(f"❌ Could not find data for '{ticker_input}'. Please check the symbol or company name.")
     else:
@@ -790,16 +2570,21 @@ with tab2:
         file_type = uploaded_file.name.split('.')[-1].lower()
 
         with st.spinner("Extracting tickers..."):
+            partial_results = st.empty()
+            show_partial = lambda found: partial_results.caption(f"Found so far: {', '.join(found)}")
+
             if file_type in ['xlsx', 'xls']:
-                tickers = read_excel_tickers(uploaded_file)
+                tickers = read_excel_tickers(uploaded_file, on_progress=show_partial)
             elif file_type == 'docx':
                 tickers = read_word_tickers(uploaded_file)
             elif file_type == 'pdf':
-                tickers = read_pdf_tickers(uploaded_file)
+                tickers = read_pdf_tickers(uploaded_file, on_progress=show_partial)
             else:
                 tickers = []
                 st.error("Unsupported file format")
 
+            partial_results.empty()
+
         if tickers:
             st.success(f"✓ Found {len(tickers)} tickers: {', '.join(tickers)}")
 
@@ -823,14 +2608,18 @@ with tab2:
                     progress_bar = st.progress(0)
                     status_text = st.empty()
 
+                    def update_progress(stage, done, total):
+                        verb = "Resolved" if stage == 'resolve' else "Fetched"
+                        status_text.text(f"{verb} {done}/{total} tickers...")
+                        progress_bar.progress(done / total)
+
+                    status_text.text("Resolving tickers...")
+                    summaries = analyze_portfolio(final_tickers, on_progress=update_progress)
+
                     results = []
                     failed_tickers = []
 
-                    for i, ticker in enumerate(final_tickers):
-                        status_text.text(f"Analyzing {ticker}...")
-                        progress_bar.progress((i + 1) / len(final_tickers))
-
-                        result = get_stock_summary(ticker)
+                    for ticker, result in zip(final_tickers, summaries):
                         if result:
                             results.append(result)
                         else:
@@ -913,15 +2702,7 @@ with tab2:
 
                         st.markdown("<br>", unsafe_allow_html=True)
 
-                        # Excel download
-                        excel_data = create_excel_download(df_results)
-                        st.download_button(
-                            label="📥 Download Excel",
-                            data=excel_data,
-                            file_name="portfolio_analysis.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                            use_container_width=True
-                        )
+                        render_export_buttons(df_results, "portfolio_analysis", key_prefix="portfolio_export")
                     else:
                         st.error("❌ Could not fetch data for any tickers.")
                 else:
@@ -937,6 +2718,99 @@ with tab2:
         </div>
         """, unsafe_allow_html=True)
 
+with tab3:
+    st.markdown('<div class="section-header">🔎 Universe Screener</div>', unsafe_allow_html=True)
+    st.markdown("Screen every constituent of an index, or of your own universe file, against its 150-Day MA")
+
+    universe_choice = st.selectbox(
+        "Universe",
+        list_universes() + ["Upload universe file"],
+        key="screener_universe"
+    )
+
+    if universe_choice == "Upload universe file":
+        universe_file = st.file_uploader(
+            "Universe file",
+            type=['csv', 'txt', 'xlsx', 'xls'],
+            help="One symbol per line, or a sheet with a Ticker/Symbol column",
+            key="screener_file"
+        )
+        universe = read_universe_file(universe_file) if universe_file is not None else []
+    else:
+        universe = get_universe_tickers(universe_choice)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        screen_condition = st.selectbox(
+            "Screen",
+            ["Below 150-MA", "Above 150-MA", "All"],
+            key="screener_condition"
+        )
+    with col2:
+        screen_gap = st.number_input(
+            "Gap % threshold",
+            value=SCREENER_DEFAULT_GAP_PCT,
+            step=0.5,
+            disabled=screen_condition == "All",
+            key="screener_gap"
+        )
+
+    if st.button(f"🔍 Screen {len(universe)} Tickers", type="primary", width="stretch",
+                 disabled=not universe, key="screener_run"):
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+
+        def update_screen_progress(done, total):
+            status_text.text(f"Fetched {done}/{total} tickers...")
+            progress_bar.progress(done / total)
+
+        connection_stats = getattr(get_market_data_provider(), 'connection_stats', lambda: None)
+        stats_before = connection_stats()
+        started = datetime.now()
+        st.session_state['screener_results'] = run_screener(universe, on_progress=update_screen_progress)
+        st.session_state['screener_elapsed'] = (datetime.now() - started).total_seconds()
+        stats_after = connection_stats()
+        st.session_state['screener_http'] = (
+            {key: stats_after[key] - stats_before[key] for key in stats_after}
+            if stats_after is not None else None
+        )
+
+        status_text.empty()
+        progress_bar.empty()
+
+    if 'screener_results' in st.session_state:
+        screen_results, screen_failed = st.session_state['screener_results']
+        elapsed = st.session_state['screener_elapsed']
+        http_stats = st.session_state.get('screener_http')
+
+        if elapsed > SCREENER_LATENCY_BUDGET:
+            st.warning(f"⚠️ Screen took {elapsed:.1f}s (budget {SCREENER_LATENCY_BUDGET}s)")
+        else:
+            st.caption(f"Screened {len(screen_results)} tickers in {elapsed:.1f}s")
+        if http_stats and http_stats['requests']:
+            st.caption(f"{http_stats['requests']} HTTP requests over {http_stats['connections']} new connections")
+        if screen_failed:
+            st.warning(f"⚠️ Could not fetch: {', '.join(screen_failed)}")
+
+        matches = filter_screen(screen_results, screen_condition, screen_gap)
+        st.success(f"✓ {len(matches)} of {len(screen_results)} tickers match")
+
+        st.dataframe(
+            matches,
+            width="stretch",
+            hide_index=True,
+            column_config={
+                "Ticker": st.column_config.TextColumn("Ticker", width="small"),
+                "Current Price": st.column_config.NumberColumn("Price", format="$%.2f"),
+                "150-Day MA": st.column_config.NumberColumn("150-MA", format="$%.2f"),
+                "Gap %": st.column_config.NumberColumn("Gap %", format="%+.2f%%"),
+                "ATR (14)": st.column_config.NumberColumn("ATR", format="$%.2f"),
+                "Stop Loss": st.column_config.NumberColumn("Stop Loss", format="$%.2f"),
+            }
+        )
+
+        render_export_buttons(matches, "screener_results", key_prefix="screener_export", sheet_name='Screener')
+
 st.markdown("""
 <div class="footer">
     Data provided by Yahoo Finance • ATR = Average True Range (14-day) • Stop Loss = 1.5% below 150-MA minus 0.5 ATR buffer
@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+# Importing the app runs it in Streamlit's bare mode; keep its price cache
+# out of the working tree
+os.environ.setdefault('PRICE_CACHE_PATH', os.path.join(tempfile.mkdtemp(), 'prices.sqlite'))
+
+
+class CountingFixtureProvider:
+    """FixtureProvider that records every history request as (ticker, start date)"""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.requests = []
+
+    def history(self, ticker, start_date, end_date):
+        self.requests.append((ticker, start_date.strftime('%Y-%m-%d')))
+        return self.provider.history(ticker, start_date, end_date)
+
+    def batch_history(self, tickers, start_date, end_date, max_workers=None):
+        self.requests.extend((t, start_date.strftime('%Y-%m-%d')) for t in tickers)
+        return self.provider.batch_history(tickers, start_date, end_date)
+
+
+@pytest.fixture
+def fixture_market(tmp_path, monkeypatch):
+    """
+    The app wired to a fresh SQLite price cache and a fixture provider with
+    a few deterministic tickers; yields the counting provider
+    """
+    import make_fixtures
+    import pandas as pd
+    import stock_analyzer as sa
+
+    fixture_dir = tmp_path / 'fixtures'
+    symbols = [{'ticker': t, 'name': t} for t in ('AAA', 'BBB', 'CCC')]
+    make_fixtures.write_fixtures(str(fixture_dir), symbols, pd.Timestamp.today(), 300)
+
+    provider = CountingFixtureProvider(sa.FixtureProvider(str(fixture_dir)))
+    monkeypatch.setattr(sa, 'PRICE_CACHE_PATH', str(tmp_path / 'prices.sqlite'))
+    monkeypatch.setattr(sa, 'get_market_data_provider', lambda: provider)
+    yield provider
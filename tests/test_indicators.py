@@ -0,0 +1,84 @@
+"""Incremental MA150/ATR state against the vectorized indicators"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import make_fixtures
+import stock_analyzer as sa
+
+
+@pytest.fixture
+def bars():
+    return make_fixtures.generate_bars('AAA', pd.Timestamp('2026-10-16'), 1000)
+
+
+def replay(df):
+    engine = sa.IncrementalIndicators()
+    values = [engine.update(h, l, c) for h, l, c in zip(df['High'], df['Low'], df['Close'])]
+    return engine, np.array(values)
+
+
+def test_rolling_mean_matches_pandas_with_gaps():
+    values = pd.Series(np.random.default_rng(0).normal(100, 5, 2000))
+    values[[10, 400, 401, 1500]] = np.nan
+    rolling = sa.RollingMean(150)
+
+    means = [rolling.push(value) for value in values]
+
+    np.testing.assert_allclose(means, values.rolling(150).mean(), rtol=1e-12)
+
+
+def test_update_matches_rolling_mean_and_calculate_atr(bars):
+    _, values = replay(bars)
+
+    np.testing.assert_allclose(values[:, 0], bars['Close'].rolling(150).mean(), rtol=1e-12)
+    np.testing.assert_allclose(values[:, 1], sa.calculate_atr(bars, period=14), rtol=1e-12)
+
+
+def test_revise_replaces_the_last_bar(bars):
+    engine, _ = replay(bars.iloc[:-1])
+    engine.update(1.0, 1.0, 1.0)
+
+    revised = engine.revise(*bars[['High', 'Low', 'Close']].iloc[-1])
+
+    expected = sa.add_indicators(bars).iloc[-1]
+    np.testing.assert_allclose(revised, expected[['MA150', 'ATR']].to_numpy(dtype=float), rtol=1e-12)
+
+
+def test_cache_extends_a_topped_up_window(bars):
+    cache = sa.IndicatorCache()
+    first = cache.frame('AAA', bars.iloc[:900])
+
+    # The window slides by five bars; the last cached bar was a partial session
+    topped_up = bars.iloc[5:905].copy()
+    topped_up.loc[bars.index[899], 'Close'] += 0.5
+    frame = cache.frame('AAA', topped_up)
+
+    assert cache.stats == {'rebuilt': 1, 'extended': 1, 'bars_computed': 6}
+    expected = sa.add_indicators(pd.concat([bars.iloc[:899], topped_up.iloc[-6:]])).loc[topped_up.index]
+    pd.testing.assert_frame_equal(frame, expected, check_freq=False, rtol=1e-12)
+    pd.testing.assert_frame_equal(first, sa.add_indicators(bars.iloc[:900]))
+
+
+def test_cache_rebuilds_readjusted_history(bars):
+    cache = sa.IndicatorCache()
+    cache.frame('AAA', bars.iloc[:900])
+    adjusted = bars.iloc[:905].copy()
+    adjusted[['Open', 'High', 'Low', 'Close']] *= 0.5
+
+    frame = cache.frame('AAA', adjusted)
+
+    assert cache.stats['rebuilt'] == 2
+    pd.testing.assert_frame_equal(frame, sa.add_indicators(adjusted))
+
+
+def test_get_stock_data_tops_up_indicators(fixture_market, monkeypatch):
+    cache = sa.IndicatorCache()
+    monkeypatch.setattr(sa, 'get_indicator_cache', lambda: cache)
+    monkeypatch.setattr(sa, 'market_data_version', lambda now=None: 'v1' if now is not None else 'v2')
+
+    first = sa.get_stock_data('AAA')
+    again = sa.get_stock_data('AAA')
+
+    assert cache.stats == {'rebuilt': 1, 'extended': 1, 'bars_computed': 1}
+    pd.testing.assert_frame_equal(again, first, check_freq=False, rtol=1e-12)
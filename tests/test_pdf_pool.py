@@ -0,0 +1,84 @@
+"""PDF process pool: spawned workers must not re-run or import the app"""
+import os
+import subprocess
+import sys
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+import multiprocessing
+import pytest
+
+import pdf_pages
+import stock_analyzer as sa
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_pdf(page_texts):
+    """A minimal PDF with one line of Helvetica text per page"""
+    count = len(page_texts)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (4 + 2 * i) for i in range(count))
+        + b"] /Count %d >>" % count,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(page_texts):
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode() + b") Tj ET"
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (5 + 2 * i))
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+@pytest.fixture
+def streamlit_style_main(tmp_path, monkeypatch):
+    """
+    Make __main__ look like it does under streamlit run: a module with a
+    __file__. The script leaves a marker file whenever a process runs it
+    """
+    marker_dir = tmp_path / 'runs'
+    marker_dir.mkdir()
+    script = tmp_path / 'fake_app.py'
+    script.write_text(
+        "import os\n"
+        f"open(os.path.join({str(marker_dir)!r}, str(os.getpid())), 'w').close()\n"
+    )
+    main = types.ModuleType('__main__')
+    main.__file__ = str(script)
+    monkeypatch.setitem(sys.modules, '__main__', main)
+    return marker_dir
+
+
+def test_spawned_workers_rerun_a_visible_main_script(streamlit_style_main):
+    # Control: without hiding __main__, spawn re-runs the script in the worker
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        executor.submit(os.getpid).result()
+    assert os.listdir(streamlit_style_main)
+
+
+def test_pdf_pool_workers_do_not_rerun_the_app(streamlit_style_main):
+    pages = [f"HOLDINGS AAPL PAGE {i}" if i % 2 else f"NVIDIA PAGE {i}" for i in range(8)]
+    data = make_pdf(pages)
+
+    page_tickers = list(sa._iter_pdf_page_tickers_parallel(data, len(pages), workers=2))
+
+    assert os.listdir(streamlit_style_main) == []
+    assert page_tickers == [sa.extract_tickers_from_text(text) for text in pages]
+    assert sys.modules['__main__'].__file__.endswith('fake_app.py')
+
+
+def test_worker_module_does_not_import_the_app():
+    check = "import sys, pdf_pages; print('stock_analyzer' in sys.modules, 'streamlit' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', check], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ['False', 'False']
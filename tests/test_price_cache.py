@@ -0,0 +1,104 @@
+"""SQLite price cache: full downloads, top-ups, same-version skips and re-adjustments"""
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import stock_analyzer as sa
+
+
+@pytest.fixture
+def window():
+    end_date = datetime.now()
+    return end_date - timedelta(days=400), end_date
+
+
+@pytest.fixture
+def same_version(monkeypatch):
+    """Every fetch falls in the current market data version"""
+    monkeypatch.setattr(sa, 'market_data_version', lambda now=None: 'v1')
+
+
+@pytest.fixture
+def new_version(monkeypatch):
+    """Anything fetched so far is from an older market data version"""
+    monkeypatch.setattr(sa, 'market_data_version', lambda now=None: 'v1' if now is not None else 'v2')
+
+
+def fixture_frame(provider, ticker, start_date, end_date):
+    return provider.provider.history(ticker, start_date, end_date)[sa.PRICE_COLUMNS]
+
+
+def test_first_request_downloads_the_whole_window(fixture_market, window, same_version):
+    start_date, end_date = window
+    df = sa.get_price_history('AAA', start_date, end_date)
+
+    assert fixture_market.requests == [('AAA', start_date.strftime('%Y-%m-%d'))]
+    expected = fixture_frame(fixture_market, 'AAA', start_date, end_date)
+    pd.testing.assert_frame_equal(df, expected, check_freq=False, check_dtype=False)
+
+
+def test_same_version_is_served_from_the_cache(fixture_market, window, same_version):
+    start_date, end_date = window
+    first = sa.get_price_history('AAA', start_date, end_date)
+    fixture_market.requests.clear()
+
+    again = sa.get_price_history('AAA', start_date, end_date)
+
+    assert fixture_market.requests == []
+    pd.testing.assert_frame_equal(again, first)
+
+
+def test_new_version_tops_up_from_the_last_cached_bar(fixture_market, window, new_version):
+    start_date, end_date = window
+    first = sa.get_price_history('AAA', start_date, end_date)
+    fixture_market.requests.clear()
+
+    again = sa.get_price_history('AAA', start_date, end_date)
+
+    last_bar = first.index[-1].strftime('%Y-%m-%d')
+    assert fixture_market.requests == [('AAA', last_bar)]
+    pd.testing.assert_frame_equal(again, first)
+
+
+def test_readjusted_history_falls_back_to_a_full_download(fixture_market, window, new_version):
+    start_date, end_date = window
+    sa.get_price_history('AAA', start_date, end_date)
+    fixture_market.requests.clear()
+
+    # The provider re-adjusts every past price, e.g. for a 2:1 split
+    frames = fixture_market.provider._frames
+    frames['AAA'] = frames['AAA'].assign(**{col: frames['AAA'][col] / 2 for col in ('Open', 'High', 'Low', 'Close')})
+    df = sa.get_price_history('AAA', start_date, end_date)
+
+    start_day = start_date.strftime('%Y-%m-%d')
+    assert [start for _, start in fixture_market.requests] == [df.index[-1].strftime('%Y-%m-%d'), start_day]
+    expected = fixture_frame(fixture_market, 'AAA', start_date, end_date)
+    pd.testing.assert_frame_equal(df, expected, check_freq=False, check_dtype=False)
+
+
+def test_expiring_a_ticker_makes_the_next_request_top_up(fixture_market, window, same_version):
+    start_date, end_date = window
+    sa.get_price_history('AAA', start_date, end_date)
+    sa.get_price_history('BBB', start_date, end_date)
+
+    sa._expire_cached_prices('AAA')
+    plan = sa._price_cache_plan(['AAA', 'BBB'], start_date)
+
+    assert plan['AAA'][0] is not None and plan['AAA'][1] is not None
+    assert plan['BBB'][0] is None
+
+    sa._expire_cached_prices()
+    assert sa._price_cache_plan(['BBB'], start_date)['BBB'][0] is not None
+
+
+def test_batch_fetch_only_downloads_what_the_cache_lacks(fixture_market, window, same_version):
+    start_date, end_date = window
+    sa.get_price_history('AAA', start_date, end_date)
+    fixture_market.requests.clear()
+
+    frames = sa._fetch_batch_price_history(['AAA', 'BBB', 'CCC'], start_date, end_date, max_workers=2)
+
+    assert sorted(fixture_market.requests) == [('BBB', start_date.strftime('%Y-%m-%d')),
+                                               ('CCC', start_date.strftime('%Y-%m-%d'))]
+    assert all(frames[t] is not None and not frames[t].empty for t in ('AAA', 'BBB', 'CCC'))
@@ -0,0 +1,178 @@
+"""RequestScheduler against a fake clock and a fake Yahoo that injects 429s"""
+import pandas as pd
+import pytest
+
+import stock_analyzer as sa
+
+
+class FakeClock:
+    """Monotonic clock that only moves when something sleeps on it"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+
+class FakeYahoo:
+    """Serves `limit` requests per (fake) second and answers the rest with a 429"""
+
+    def __init__(self, clock, limit):
+        self.clock = clock
+        self.limit = limit
+        self.window = None
+        self.in_window = 0
+        self.served = 0
+        self.throttled = 0
+
+    def __call__(self, ticker):
+        second = int(self.clock.now)
+        if second != self.window:
+            self.window, self.in_window = second, 0
+        self.in_window += 1
+        if self.in_window > self.limit:
+            self.throttled += 1
+            raise RuntimeError(f"429 Client Error: Too Many Requests for {ticker}")
+        self.served += 1
+        return ticker
+
+
+def make_scheduler(clock, **kwargs):
+    return sa.RequestScheduler(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_paces_to_the_configured_rate():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, rate=10, burst=5)
+    for i in range(105):
+        scheduler.call(lambda: None)
+    # The burst goes through at once, the other 100 at 10 per second
+    assert clock.now == pytest.approx(10.0)
+
+
+def test_recovers_every_request_from_injected_429s():
+    clock = FakeClock()
+    server = FakeYahoo(clock, limit=20)
+    scheduler = make_scheduler(clock, rate=40, burst=10)
+
+    tickers = [f"T{i}" for i in range(300)]
+    results = [scheduler.call(server, ticker) for ticker in tickers]
+
+    assert results == tickers
+    assert server.throttled > 0
+    assert scheduler.stats['rate_limited'] == server.throttled
+    assert scheduler.stats['failures'] == 0
+    # Backing off keeps it near the server's limit: 300 requests at 20/s is 15 s
+    assert clock.now < 30
+
+
+def test_throttling_lowers_the_rate_and_successes_restore_it():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, rate=10, burst=10)
+    responses = iter([RuntimeError("429 Too Many Requests"), 'ok'])
+
+    def flaky():
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert scheduler.call(flaky) == 'ok'
+    assert scheduler.stats['retries'] == 1
+    assert scheduler.rate == pytest.approx(5 + 10 * 0.05)
+    for _ in range(20):
+        scheduler.call(lambda: None)
+    assert scheduler.rate == 10
+
+
+def test_permanent_errors_are_not_retried():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    calls = []
+
+    def bad_symbol():
+        calls.append(1)
+        raise KeyError('symbol')
+
+    with pytest.raises(KeyError):
+        scheduler.call(bad_symbol)
+    assert len(calls) == 1
+    assert scheduler.stats == {'requests': 1, 'retries': 0, 'rate_limited': 0, 'failures': 1}
+
+
+def test_retry_budget_caps_retries_during_an_outage():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock, retry_budget=3, retry_budget_ratio=0)
+
+    def down():
+        raise ConnectionError("connection refused")
+
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            scheduler.call(down)
+    assert scheduler.stats['retries'] == 3
+    assert scheduler.stats['failures'] == 5
+
+
+def test_cold_sp500_screen_pacing_fits_the_latency_budget():
+    clock = FakeClock()
+    scheduler = make_scheduler(clock)
+    for _ in range(0, 500, sa.PORTFOLIO_BATCH_SIZE):
+        scheduler.call(lambda: None, cost=sa.PORTFOLIO_BATCH_SIZE)
+    assert clock.now < sa.SCREENER_LATENCY_BUDGET / 2
+
+
+def test_batch_history_waits_for_tokens_outside_the_download_lock(monkeypatch):
+    clock = FakeClock()
+    provider = None
+    waits = []
+
+    def sleep(seconds):
+        waits.append(provider._download_lock.locked())
+        clock.sleep(seconds)
+
+    def download(tickers, **kwargs):
+        assert provider._download_lock.locked()
+        return pd.DataFrame()
+
+    monkeypatch.setattr(sa.yf, 'download', download)
+    scheduler = sa.RequestScheduler(rate=10, burst=10, clock=clock, sleep=sleep)
+    provider = sa.YFinanceProvider(scheduler=scheduler, session='fake-session')
+
+    tickers = [f"T{i}" for i in range(20)]
+    provider.batch_history(tickers, '2024-01-01', '2024-06-01')
+    provider.batch_history(tickers, '2024-01-01', '2024-06-01')
+
+    assert waits and not any(waits)
+
+
+def test_batch_history_retries_tickers_the_download_dropped_for_throttling(monkeypatch):
+    clock = FakeClock()
+    throttled = {'BBB'}
+    calls = []
+
+    def download(tickers, **kwargs):
+        # Like yf.download: throttled symbols are logged and left out
+        calls.append(list(tickers))
+        served = [t for t in tickers if t not in throttled]
+        if throttled & set(tickers):
+            sa.logging.getLogger('yfinance').error(
+                "%s: YFRateLimitError('Too Many Requests. Rate limited. Try after a while.')", sorted(throttled))
+            throttled.clear()
+        bars = pd.DataFrame({'Close': [1.0]}, index=pd.DatetimeIndex(['2024-01-02']))
+        return pd.concat({t: bars for t in served}, axis=1)
+
+    monkeypatch.setattr(sa.yf, 'download', download)
+    scheduler = make_scheduler(clock)
+    provider = sa.YFinanceProvider(scheduler=scheduler, session='fake-session')
+
+    frames = provider.batch_history(['AAA', 'BBB'], '2024-01-01', '2024-06-01')
+
+    assert sorted(frames) == ['AAA', 'BBB']
+    assert calls == [['AAA', 'BBB'], ['AAA', 'BBB']]
+    assert scheduler.stats['rate_limited'] == 1
+    assert scheduler.rate < sa.YF_REQUESTS_PER_SECOND
@@ -0,0 +1,121 @@
+"""SingleFlight with real threads: followers share the leader's call"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import stock_analyzer as sa
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.001)
+
+
+class BlockingCall:
+    """A function that records its calls and blocks until released"""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, *args):
+        self.calls.append(args)
+        self.started.set()
+        assert self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def run_with_followers(flight, call, leader, follower, count=4):
+    """Start the leader, let count followers join it, then release the call"""
+    with ThreadPoolExecutor(max_workers=count + 1) as executor:
+        led = executor.submit(leader)
+        assert call.started.wait(5)
+        joined = [executor.submit(follower) for _ in range(count)]
+        wait_for(lambda: flight.stats['shared'] == count)
+        call.release.set()
+        return led, joined
+
+
+def test_followers_get_the_leaders_result():
+    flight = sa.SingleFlight()
+    call = BlockingCall(result=object())
+
+    def fetch():
+        return flight.do('AAA', call, 'AAA')
+
+    led, joined = run_with_followers(flight, call, fetch, fetch)
+
+    assert all(future.result() is call.result for future in [led, *joined])
+    assert call.calls == [('AAA',)]
+    assert flight.stats == {'executed': 1, 'shared': 4}
+    assert flight._calls == {}
+
+
+def test_followers_get_the_leaders_exception():
+    flight = sa.SingleFlight()
+    call = BlockingCall(error=ConnectionError('down'))
+
+    def fetch():
+        return flight.do('AAA', call, 'AAA')
+
+    led, joined = run_with_followers(flight, call, fetch, fetch)
+
+    for future in [led, *joined]:
+        with pytest.raises(ConnectionError) as raised:
+            future.result()
+        assert raised.value is call.error
+    assert len(call.calls) == 1
+    assert flight._calls == {}
+
+
+def test_do_many_coalesces_the_keys_shared_by_overlapping_batches():
+    flight = sa.SingleFlight()
+    first = BlockingCall(result={'AAA': 1, 'BBB': 2})
+    second_calls = []
+
+    def second(keys):
+        second_calls.append(keys)
+        return {key: key.lower() for key in keys}
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        led = executor.submit(flight.do_many, ['AAA', 'BBB'], lambda keys: first(keys))
+        assert first.started.wait(5)
+        overlapping = executor.submit(flight.do_many, ['BBB', 'CCC'], second)
+        wait_for(lambda: flight.stats['shared'] == 1)
+        first.release.set()
+
+        assert led.result() == {'AAA': 1, 'BBB': 2}
+        assert overlapping.result() == {'BBB': 2, 'CCC': 'ccc'}
+
+    assert first.calls == [(['AAA', 'BBB'],)]
+    assert second_calls == [['CCC']]
+    assert flight.stats == {'executed': 3, 'shared': 1}
+    assert flight._calls == {}
+
+
+def test_do_many_failure_reaches_followers_and_clears_every_key():
+    flight = sa.SingleFlight()
+    call = BlockingCall(error=TimeoutError('batch timed out'))
+
+    def batch():
+        return flight.do_many(['AAA', 'BBB'], call)
+
+    def follower():
+        return flight.do('BBB', lambda: 'unused')
+
+    led, joined = run_with_followers(flight, call, batch, follower, count=2)
+
+    for future in [led, *joined]:
+        with pytest.raises(TimeoutError):
+            future.result()
+    assert flight._calls == {}
+    assert flight.do_many(['AAA', 'BBB'], lambda keys: {key: 0 for key in keys}) == {'AAA': 0, 'BBB': 0}
@@ -0,0 +1,53 @@
+"""Bundled symbol index and resolve_ticker"""
+import pytest
+
+import stock_analyzer as sa
+
+
+@pytest.fixture
+def listed(monkeypatch):
+    """Pretend these symbols trade; everything else fails symbol validation"""
+    symbols = set()
+    monkeypatch.setattr(sa, '_symbol_has_history', lambda symbol: symbol in symbols)
+    monkeypatch.setattr(sa, '_lookup_symbol_online', lambda text: None)
+    return symbols
+
+
+def test_bundled_index_loads_and_memberships_sit_on_common_shares():
+    index = sa.load_symbol_index()
+    assert 'GS' in sa.get_universe_tickers('DOW JONES')
+    assert {'GS', 'RF', 'BALL', 'DOC', 'EG'} <= set(sa.get_universe_tickers('S&P 500'))
+    assert not {'GS-PK', 'RF-PB', 'BLL', 'PEAK', 'RE'} & set(index['symbols'])
+
+
+@pytest.mark.parametrize('entries, problem', [
+    ([{'ticker': 'GS-PK', 'name': 'Goldman Sachs'}], "bad ticker 'GS-PK'"),
+    ([{'ticker': 'AJG', 'name': 'Arthur J. Gallagher & Co.'},
+      {'ticker': 'AIZ', 'name': 'Arthur J. Gallagher & Co'}], 'listed for both AJG and AIZ'),
+])
+def test_validation_rejects_preferreds_and_duplicate_names(entries, problem):
+    with pytest.raises(ValueError, match=problem):
+        sa.validate_symbol_index(entries)
+
+
+@pytest.mark.parametrize('text, ticker', [
+    ('Ball', 'BALL'),
+    ('BALL', 'BALL'),
+    ('Regions Financial', 'RF'),
+    ('Goldman Sachs', 'GS'),
+    ('HP', 'HP'),
+    ('FOX', 'FOX'),
+    ('Fox Corporation', 'FOXA'),
+    ('Apple', 'AAPL'),
+])
+def test_resolves_names_and_symbols(listed, text, ticker):
+    assert sa.resolve_ticker(text) == ticker
+
+
+def test_short_input_stays_a_symbol_when_it_validates(listed):
+    listed.add('BNY')
+    assert sa.resolve_ticker('BNY') == 'BNY'
+
+
+def test_short_input_falls_back_to_a_name_when_it_does_not_validate(listed):
+    assert sa.resolve_ticker('BNY') == 'BK'